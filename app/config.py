@@ -10,6 +10,12 @@ APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000").rstrip("/")
 
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
 GEMINI_MODEL = "gemini-2.0-flash"
+# Upper bound on concurrent Gemini vision calls per worker
+GEMINI_MAX_PARALLEL = int(os.getenv("GEMINI_MAX_PARALLEL", "4"))
+# Shrink uploads to VISION_MAX_EDGE px (JPEG) before vision analysis. Leave off
+# when model/serial plates must stay legible at full resolution.
+GEMINI_DOWNSCALE = os.getenv("GEMINI_DOWNSCALE", "false").lower() in ("1", "true")
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1024"))
 
 # Google Cloud credentials (service account JSON for STT/TTS)
 GCP_CREDENTIALS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
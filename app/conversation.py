@@ -1,136 +1,146 @@
+import re
 from datetime import datetime
-import json
+from functools import lru_cache
 from .db import SessionLocal
 from .models import ConversationState
 
 
+class StateDict(dict):
+    """
+    Conversation state that remembers whether it was modified since it was
+    loaded, so update_state can skip rewriting an unchanged row.
+    Only top-level writes are tracked, so nested values must be assigned
+    back rather than mutated in place.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = False
+
+    def __setitem__(self, key, value):
+        # Containers always count as a change: the caller may have mutated
+        # the same list it is assigning back.
+        if key not in self or isinstance(value, (list, dict)) or self[key] != value:
+            self.dirty = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.dirty = True
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self.dirty = True
+        super().update(*args, **kwargs)
+
+    def pop(self, *args):
+        self.dirty = True
+        return super().pop(*args)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.dirty = True
+        return super().setdefault(key, default)
+
+
+# Built once; _get_initial_state copies it and gives each call fresh lists
+_INITIAL_STATE = {
+    "step": "greet_ask_name",
+    "appliance_type": None,
+    "symptoms": None,
+    "symptom_summary": None,
+    "error_codes": [],
+    "is_urgent": False,
+    "troubleshooting_step": 0,
+    "resolved": False,
+    "zip_code": None,
+    "zip_spoken": None,
+    "time_preference": None,
+    "offered_slots": [],  # legacy: full slot dicts, only in calls started before offered_slot_ids
+    "offered_slot_ids": [],
+    "offered_slots_speech": None,
+    "customer_phone": None,
+    "appointment_booked": False,
+    "appointment_id": None,
+    "no_input_attempts": 0,
+    "no_match_attempts": 0,
+    "slow_speaker": False,  # set after two consecutive silent turns; keeps re-asks patient
+    # Email capture with confirmation loop (Issue 1)
+    "customer_email": None,
+    "pending_email": None,  # Email awaiting confirmation
+    "pending_email_speech": None,  # Speech it was extracted from (its cache key)
+    "email_attempts": 0,
+    "email_confirm_attempts": 0,
+    # Image upload flow (Issue 2)
+    "image_upload_sent": False,
+    "upload_token": None,
+    "waiting_for_upload": False,
+    "upload_poll_count": 0,
+    "image_analysis_spoken": False,
+    # Autonomous flow fields
+    "understand_attempts": 0,
+    "appliance_attempts": 0,
+    "zip_attempts": 0,
+    "customer_name": None,
+    "troubleshooting_steps_text": None,
+    "analysis_spoken": False,
+    "upload_wait_attempts": 0,
+}
+_INITIAL_STATE_LISTS = tuple(k for k, v in _INITIAL_STATE.items() if isinstance(v, list))
+
+
 def _get_initial_state() -> dict:
     """Returns the initial state template."""
-    return {
-        "step": "greet_ask_name",
-        "appliance_type": None,
-        "symptoms": None,
-        "symptom_summary": None,
-        "error_codes": [],
-        "is_urgent": False,
-        "troubleshooting_step": 0,
-        "resolved": False,
-        "zip_code": None,
-        "time_preference": None,
-        "offered_slots": [],
-        "customer_phone": None,
-        "appointment_booked": False,
-        "appointment_id": None,
-        "no_input_attempts": 0,
-        "no_match_attempts": 0,
-        # Email capture with confirmation loop (Issue 1)
-        "customer_email": None,
-        "pending_email": None,  # Email awaiting confirmation
-        "email_attempts": 0,
-        "email_confirm_attempts": 0,
-        # Image upload flow (Issue 2)
-        "image_upload_sent": False,
-        "upload_token": None,
-        "waiting_for_upload": False,
-        "upload_poll_count": 0,
-        "image_analysis_spoken": False,
-        # Autonomous flow fields
-        "understand_attempts": 0,
-        "appliance_attempts": 0,
-        "zip_attempts": 0,
-        "customer_name": None,
-        "troubleshooting_steps_text": None,
-        "analysis_spoken": False,
-        "upload_wait_attempts": 0,
-    }
+    state = _INITIAL_STATE.copy()
+    for key in _INITIAL_STATE_LISTS:
+        state[key] = []
+    return state
+
+
+# The only datetime-bearing fields: top-level start/end times and the same
+# keys inside legacy offered_slots entries. Everything else is JSON-native.
+_DATETIME_KEYS = ("start_time", "end_time")
+
+
+def _parse_iso(value: str):
+    # Python 3.11's fromisoformat takes a trailing "Z" directly. The guard is
+    # free unless it fires, and keeps one corrupt field from failing get_state.
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
 
 
 def _serialize_state(state: dict) -> dict:
     """Convert datetime objects in state to ISO format strings for JSON storage."""
-    serialized = {}
-    for key, value in state.items():
+    serialized = dict(state)
+    for key in _DATETIME_KEYS:
+        value = serialized.get(key)
         if isinstance(value, datetime):
             serialized[key] = value.isoformat()
-        elif isinstance(value, list):
-            # Handle lists - check if it's offered_slots (list of dicts with datetime)
-            if key == "offered_slots":
-                serialized[key] = []
-                for slot in value:
-                    if isinstance(slot, dict):
-                        slot_copy = {}
-                        for k, v in slot.items():
-                            if isinstance(v, datetime):
-                                slot_copy[k] = v.isoformat()
-                            else:
-                                slot_copy[k] = v
-                        serialized[key].append(slot_copy)
-                    else:
-                        serialized[key].append(slot)
-            else:
-                # Regular list - just check for datetime objects
-                serialized[key] = [
-                    item.isoformat() if isinstance(item, datetime) else item
-                    for item in value
-                ]
-        elif isinstance(value, dict):
-            # Handle nested dicts
-            serialized[key] = {
-                k: v.isoformat() if isinstance(v, datetime) else v
-                for k, v in value.items()
-            }
-        else:
-            serialized[key] = value
+    slots = serialized.get("offered_slots")
+    if slots:
+        serialized["offered_slots"] = [
+            {**slot, **{k: slot[k].isoformat() for k in _DATETIME_KEYS if isinstance(slot.get(k), datetime)}}
+            if isinstance(slot, dict) else slot
+            for slot in slots
+        ]
     return serialized
 
 
 def _deserialize_state(state_data: dict) -> dict:
     """Convert ISO format strings back to datetime objects where needed."""
-    deserialized = {}
-    for key, value in state_data.items():
-        if key in ["start_time", "end_time"] and isinstance(value, str):
-            try:
-                deserialized[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-            except (ValueError, AttributeError):
-                deserialized[key] = value
-        elif isinstance(value, list):
-            # Handle lists - check if it's offered_slots
-            if key == "offered_slots":
-                deserialized[key] = []
-                for slot in value:
-                    if isinstance(slot, dict):
-                        slot_copy = {}
-                        for k, v in slot.items():
-                            if k in ["start_time", "end_time"] and isinstance(v, str):
-                                try:
-                                    slot_copy[k] = datetime.fromisoformat(v.replace('Z', '+00:00'))
-                                except (ValueError, AttributeError):
-                                    slot_copy[k] = v
-                            else:
-                                slot_copy[k] = v
-                        deserialized[key].append(slot_copy)
-                    else:
-                        deserialized[key].append(slot)
-            else:
-                deserialized[key] = value  # Keep as-is for other lists
-        elif isinstance(value, dict):
-            # Handle nested dicts - convert datetime strings in offered_slots
-            if key == "offered_slots":
-                deserialized[key] = []
-                for slot in value:
-                    slot_copy = {}
-                    for k, v in slot.items():
-                        if k in ["start_time", "end_time"] and isinstance(v, str):
-                            try:
-                                slot_copy[k] = datetime.fromisoformat(v.replace('Z', '+00:00'))
-                            except (ValueError, AttributeError):
-                                slot_copy[k] = v
-                        else:
-                            slot_copy[k] = v
-                    deserialized[key].append(slot_copy)
-            else:
-                deserialized[key] = value
-        else:
-            deserialized[key] = value
+    deserialized = dict(state_data)
+    for key in _DATETIME_KEYS:
+        value = deserialized.get(key)
+        if isinstance(value, str):
+            deserialized[key] = _parse_iso(value)
+    slots = deserialized.get("offered_slots")
+    if isinstance(slots, list) and slots:
+        deserialized["offered_slots"] = [
+            {**slot, **{k: _parse_iso(slot[k]) for k in _DATETIME_KEYS if isinstance(slot.get(k), str)}}
+            if isinstance(slot, dict) else slot
+            for slot in slots
+        ]
     return deserialized
 
 
@@ -147,7 +157,7 @@ def get_state(call_id: str) -> dict:
             # Return existing state (deserialize if needed)
             state_data = state_record.state_data
             if isinstance(state_data, dict):
-                return _deserialize_state(state_data)
+                return StateDict(_deserialize_state(state_data))
             return state_data
         
         # No existing state - create initial state
@@ -163,20 +173,27 @@ def get_state(call_id: str) -> dict:
         db.add(new_state_record)
         db.commit()
         
-        return initial_state
+        return StateDict(initial_state)
     except Exception as e:
         import logging
         logger = logging.getLogger("voice_agent.conversation")
         logger.error(f"Failed to get state for {call_id}: {e}", exc_info=True)
         db.rollback()
-        # Fallback to initial state if DB fails
-        return _get_initial_state()
+        # Fallback to initial state if DB fails; dirty so the next write persists it
+        fallback = StateDict(_get_initial_state())
+        fallback.dirty = True
+        return fallback
     finally:
         db.close()
 
 
 def update_state(call_id: str, new_state: dict) -> None:
-    """Updates the state for a given call in database."""
+    """
+    Updates the state for a given call in database.
+    A StateDict that has not been modified since get_state is skipped.
+    """
+    if isinstance(new_state, StateDict) and not new_state.dirty:
+        return
     db = SessionLocal()
     try:
         # Serialize datetime objects before storing
@@ -200,6 +217,8 @@ def update_state(call_id: str, new_state: dict) -> None:
             db.add(state_record)
         
         db.commit()
+        if isinstance(new_state, StateDict):
+            new_state.dirty = False
     except Exception as e:
         import logging
         logger = logging.getLogger("voice_agent.conversation")
@@ -209,22 +228,33 @@ def update_state(call_id: str, new_state: dict) -> None:
         db.close()
 
 
+# keyword -> appliance type
+_APPLIANCE_KEYWORDS = {
+    "dishwasher": "dishwasher",
+    "washer": "washer", "washing machine": "washer",
+    "dryer": "dryer",
+    "fridge": "refrigerator", "refrigerator": "refrigerator",
+    "oven": "oven", "stove": "oven",
+    "ac": "hvac", "air conditioner": "hvac", "hvac": "hvac",
+}
+# When several appliances are mentioned, the first type in this order wins
+_APPLIANCE_PRIORITY = ("dishwasher", "washer", "dryer", "refrigerator", "oven", "hvac")
+# All keywords as whole words (optionally plural) in a single scan, so
+# "washer" no longer matches inside "dishwasher" nor "ac" inside "black"
+_APPLIANCE_RE = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, _APPLIANCE_KEYWORDS), key=len, reverse=True)) + r")s?\b"
+)
+
+
 def infer_appliance_type(user_text: str) -> str | None:
     """Infers appliance type from user text using simple keyword matching."""
-    text = user_text.lower()
-    # Check "dishwasher" BEFORE "washer" to avoid false match
-    if "dishwasher" in text:
-        return "dishwasher"
-    if "washer" in text or "washing machine" in text:
-        return "washer"
-    if "dryer" in text:
-        return "dryer"
-    if "fridge" in text or "refrigerator" in text:
-        return "refrigerator"
-    if "oven" in text or "stove" in text:
-        return "oven"
-    if "ac" in text or "air conditioner" in text or "hvac" in text:
-        return "hvac"
-    return None
+    return _infer_appliance_type(user_text.lower())
+
+
+# Short replies ("my washer", "the fridge") repeat across calls
+@lru_cache(maxsize=256)
+def _infer_appliance_type(text: str) -> str | None:
+    found = {_APPLIANCE_KEYWORDS[m.group(1)] for m in _APPLIANCE_RE.finditer(text)}
+    return next((appliance for appliance in _APPLIANCE_PRIORITY if appliance in found), None)
 
 
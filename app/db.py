@@ -1,10 +1,13 @@
+import json
 import os
 import time
 import logging
+from datetime import date
 from urllib.parse import quote_plus
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
 
 logger = logging.getLogger("voice_agent.db")
 
@@ -34,6 +37,21 @@ def get_database_url() -> str:
     return mysql_url
 
 
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_dumps(value) -> str:
+    """
+    Serializer for JSON columns (conversation state is written every turn).
+    Compact separators keep the payload small, and stray datetimes are stored
+    as ISO strings instead of failing the write.
+    """
+    return json.dumps(value, separators=(",", ":"), default=_json_default)
+
+
 def create_engine_with_retry(database_url: str, max_retries: int = 5, retry_delay: int = 2):
     """
     Create database engine with retry logic for MySQL readiness.
@@ -42,8 +60,14 @@ def create_engine_with_retry(database_url: str, max_retries: int = 5, retry_dela
     """
     is_sqlite = database_url.startswith("sqlite")
     
+    engine_kwargs = {}
     if is_sqlite:
-        connect_args = {}
+        # Sessions are also opened from worker threads (asyncio.to_thread)
+        connect_args = {"check_same_thread": False}
+        if database_url in ("sqlite://", "sqlite:///:memory:"):
+            # An in-memory DB lives and dies with its connection: share one
+            # so every session (and thread) sees the same tables
+            engine_kwargs["poolclass"] = StaticPool
     else:
         connect_args = {
             "connect_timeout": 10,
@@ -53,8 +77,10 @@ def create_engine_with_retry(database_url: str, max_retries: int = 5, retry_dela
     engine = create_engine(
         database_url,
         connect_args=connect_args,
+        **engine_kwargs,
         pool_pre_ping=not is_sqlite,  # Verify connections before using (not needed for SQLite)
         pool_recycle=3600,   # Recycle connections after 1 hour
+        json_serializer=_json_dumps,
         echo=False
     )
     
@@ -5,6 +5,7 @@ Token creation, URL building, and email sending for vision-based diagnosis.
 import os
 import uuid
 import re
+import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -15,6 +16,12 @@ from .logging_config import get_logger
 
 logger = get_logger("image_service")
 
+# Per-call upload notification events (set by the upload handler once analysis
+# is stored, awaited by the voice flow instead of polling on every Gather cycle).
+# Process-local: with multiple workers the DB status check remains the fallback.
+# Only calls with a voice turn currently waiting have an entry
+_upload_events: dict[str, asyncio.Event] = {}
+
 
 def generate_upload_token() -> str:
     """Generate a secure random token for image uploads."""
@@ -154,6 +161,9 @@ def reset_upload_for_reupload(call_sid: str) -> Optional[str]:
             upload_token.is_appliance_image = None
             db.commit()
             db.refresh(upload_token)
+            event = _upload_events.get(call_sid)
+            if event:
+                event.clear()
             logger.info(f"Reset upload token for re-upload: {upload_token.token[:8]}...", 
                        extra={"call_sid": call_sid})
             return build_upload_url(upload_token.token)
@@ -194,6 +204,39 @@ def get_upload_status_by_call_sid(call_sid: str) -> Optional[dict]:
         db.close()
 
 
+def notify_upload_complete(call_sid: str):
+    """Wake up any voice turn waiting on this call's upload analysis."""
+    event = _upload_events.get(call_sid)
+    if event:
+        event.set()
+
+
+async def wait_for_upload(call_sid: str, timeout: float = 12.0) -> bool:
+    """
+    Wait for the upload handler to signal that analysis is stored.
+    Returns True if notified (or already stored), False on timeout. The entry
+    is removed either way, so timed-out waits don't keep an Event per call alive.
+    """
+    event = _upload_events.setdefault(call_sid, asyncio.Event())
+    try:
+        # The caller's status check ran before the Event existed; a notify in
+        # that gap found nobody to wake, so look once more now that it's registered
+        status = await asyncio.to_thread(get_upload_status_by_call_sid, call_sid)
+        if status and status.get("analysis_ready"):
+            return True
+        await asyncio.wait_for(event.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        _upload_events.pop(call_sid, None)
+    return True
+
+
+def discard_upload_event(call_sid: str):
+    """Drop any upload wakeup state for a call that has ended."""
+    _upload_events.pop(call_sid, None)
+
+
 def validate_email(email: str) -> bool:
     """Basic email validation using regex."""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
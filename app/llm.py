@@ -1,6 +1,7 @@
 import json
 import re
-import google.generativeai as genai
+import sys
+from functools import lru_cache
 from .config import GEMINI_API_KEY, GEMINI_MODEL
 from .logging_config import get_logger
 
@@ -8,6 +9,9 @@ logger = get_logger("llm")
 
 model = None
 if GEMINI_API_KEY:
+    # Imported only when configured: the SDK dominates this module's import time
+    # and keyword-fallback deployments never touch it.
+    import google.generativeai as genai
     genai.configure(api_key=GEMINI_API_KEY)
     model = genai.GenerativeModel(GEMINI_MODEL)
 
@@ -18,6 +22,9 @@ GENERATION_CONFIG = {
 }
 
 VALID_APPLIANCES = {"washer", "dryer", "refrigerator", "dishwasher", "oven", "hvac", "other"}
+# Maps a parsed model answer to the shared (interned) literal, so appliance
+# types from the LLM compare by identity like the ones from keyword inference
+_CANONICAL_APPLIANCES = {a: sys.intern(a) for a in VALID_APPLIANCES if a != "other"}
 
 # Common appliance brand names - if mentioned, assume appliance-related
 APPLIANCE_BRANDS = {
@@ -34,6 +41,69 @@ APPLIANCE_KEYWORDS = {
     "hvac", "heating", "cooling", "air conditioner", "ac", "furnace", "heat pump"
 }
 
+# Keyword fallback for llm_analyze_customer_intent: synonym -> appliance type,
+# in priority order. Named appliances outrank generic words, so "refrigerator
+# not cooling" is a refrigerator, not hvac. The regex is generated from this
+# one table (longest first, whole words, optional plural).
+_INTENT_APPLIANCE_SYNONYMS = {
+    "dishwasher": "dishwasher",
+    "air conditioner": "hvac", "heat pump": "hvac",
+    "washer": "washer", "washing": "washer",
+    "dryer": "dryer", "drying": "dryer",
+    "fridge": "refrigerator", "refrigerator": "refrigerator", "freezer": "refrigerator",
+    "oven": "oven", "stove": "oven", "range": "oven", "cooktop": "oven",
+    "hvac": "hvac", "furnace": "hvac", "ac": "hvac",
+    "heating": "hvac", "cooling": "hvac",
+}
+_INTENT_APPLIANCE_RE = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, _INTENT_APPLIANCE_SYNONYMS), key=len, reverse=True)) + r")s?\b"
+)
+
+
+def _keyword_appliance(text_lower: str) -> str | None:
+    """Highest-priority appliance named in already-lowercased text, if any."""
+    found = {m.group(1) for m in _INTENT_APPLIANCE_RE.finditer(text_lower)}
+    return next((a for kw, a in _INTENT_APPLIANCE_SYNONYMS.items() if kw in found), None)
+
+
+# Keyword fallbacks for llm_analyze_customer_intent. Leading word boundary only,
+# so inflections still match ("booking") but embedded words do not ("service" ≠ "ice").
+_SCHEDULING_RE = re.compile(
+    r"\b(?:schedule|technician|appointment|book|visit|come out|send someone)"
+)
+_SYMPTOM_RE = re.compile(
+    r"\b(?:not cooling|not working|won't start|leaking|broken"
+    r"|noise|loud|error|won't turn|not heating|not spinning"
+    r"|not draining|won't drain|smells|smoking|sparking"
+    r"|vibrating|shaking|flooding|overflowing|beeping"
+    r"|flashing|frozen|ice|warm|hot|cold)"
+)
+
+
+def _phrase_re(phrases: list[str]) -> re.Pattern:
+    """Compile phrases into one case-insensitive alternation (one scan instead of N `in` checks)."""
+    return re.compile("|".join(re.escape(p) for p in phrases), re.IGNORECASE)
+
+
+# Keyword fallbacks for llm_interpret_troubleshooting_response. Negated phrases
+# ("not fixed") are checked first so they short-circuit the resolved phrases
+# they contain; resolved phrases then win over the broad negative words.
+_TS_RESOLVED_RE = _phrase_re([
+    "fixed", "that worked", "it worked", "working now", "all good",
+    "problem solved", "resolved", "that helped", "it's working",
+])
+_TS_NEGATIVE_RE = _phrase_re([
+    "not working", "same issue", "didn't help", "didn't work", "worse",
+    "no change", "nothing changed", "same problem", "still broken",
+    "doesn't work", "doesn't help", "still not", "won't work",
+    "no luck", "not fixed",
+])
+# Whole whitespace-delimited tokens only: a hashed set lookup per token
+_TS_NEGATIVE_WORDS = frozenset({"no", "nope", "didn't", "doesn't", "checked", "tried", "already"})
+# Coarser lists used when the Gemini call itself fails
+_TS_ERROR_NEGATIVE_RE = _phrase_re(["no", "still", "not working", "didn't help"])
+_TS_ERROR_POSITIVE_RE = _phrase_re(["yes", "fixed", "working", "helped"])
+
 
 def _contains_appliance_hint(text: str) -> bool:
     """Check if text contains brand names or appliance keywords."""
@@ -179,30 +249,12 @@ def llm_interpret_troubleshooting_response(speech_text: str, troubleshooting_ste
     
     if not model:
         # Fallback: keyword matching — default to NOT resolved unless explicitly positive
-        text_lower = speech_text.lower()
-        
-        # Check RESOLVED phrases first — these are specific and take priority
-        resolved_phrases = [
-            "fixed", "that worked", "it worked", "working now", "all good",
-            "problem solved", "resolved", "that helped", "it's working",
-        ]
-        if any(phrase in text_lower for phrase in resolved_phrases):
-            return {"is_resolved": True, "confidence": "medium", "interpretation": speech_text}
-        
-        # Then check negative patterns — broader, so checked second
-        negative_phrases = [
-            "not working", "same issue", "didn't help", "didn't work", "worse",
-            "no change", "nothing changed", "same problem", "still broken",
-            "doesn't work", "doesn't help", "still not", "won't work",
-            "no luck", "not fixed",
-        ]
-        negative_words = ["no", "nope", "didn't", "doesn't", "checked", "tried", "already"]
-        
-        if any(phrase in text_lower for phrase in negative_phrases):
+        if _TS_NEGATIVE_RE.search(speech_text):
             return {"is_resolved": False, "confidence": "medium", "interpretation": speech_text}
-        # For single words, check as whole words to avoid substring false matches
-        words_set = set(text_lower.split())
-        if any(w in words_set for w in negative_words):
+        if _TS_RESOLVED_RE.search(speech_text):
+            return {"is_resolved": True, "confidence": "medium", "interpretation": speech_text}
+        # Single words are checked as whole words to avoid substring false matches
+        if not _TS_NEGATIVE_WORDS.isdisjoint(speech_text.lower().split()):
             return {"is_resolved": False, "confidence": "medium", "interpretation": speech_text}
         
         return {"is_resolved": False, "confidence": "low", "interpretation": speech_text}
@@ -292,10 +344,9 @@ def llm_interpret_troubleshooting_response(speech_text: str, troubleshooting_ste
     except Exception as e:
         logger.error(f"Troubleshoot interpretation error: {e}")
         # Fallback to simple keyword matching
-        text_lower = speech_text.lower()
-        if any(word in text_lower for word in ["no", "still", "not working", "didn't help"]):
+        if _TS_ERROR_NEGATIVE_RE.search(speech_text):
             return {"is_resolved": False, "confidence": "medium", "interpretation": speech_text}
-        elif any(word in text_lower for word in ["yes", "fixed", "working", "helped"]):
+        elif _TS_ERROR_POSITIVE_RE.search(speech_text):
             return {"is_resolved": True, "confidence": "medium", "interpretation": speech_text}
         else:
             return {"is_resolved": False, "confidence": "low", "interpretation": speech_text}
@@ -504,9 +555,7 @@ User text:
         
         logger.debug(f"Appliance classification result: {appliance}")
         
-        if appliance in VALID_APPLIANCES:
-            return appliance if appliance != "other" else None
-        return None
+        return _CANONICAL_APPLIANCES.get(appliance)
         
     except Exception as e:
         logger.error(f"Appliance classification failed: {e}")
@@ -534,6 +583,36 @@ _NUMBER_WORDS = {
 }
 
 
+# Email normalization patterns, compiled once. Each alternation replaces a
+# loop of per-pattern re.sub passes; input is already lowercased.
+_TLD_PLACEHOLDERS = {
+    '.com': '___DOTCOM___',
+    '.net': '___DOTNET___',
+    '.org': '___DOTORG___',
+    '.edu': '___DOTEDU___',
+    '.io': '___DOTIO___',
+    '.co.uk': '___DOTCOUK___',
+}
+_TLD_RESTORED = {v: k for k, v in _TLD_PLACEHOLDERS.items()}
+_TLD_PROTECT_RE = re.compile(r'\.(?:com|net|org|edu|io|co\.uk)')
+_TLD_RESTORE_RE = re.compile('|'.join(map(re.escape, _TLD_RESTORED)))
+_INTER_LETTER_PUNCT_RE = re.compile(r'(?<=[a-z0-9\s])[.,](?=[a-z0-9\s]|$)')
+_EMAIL_FILLER_RE = re.compile(
+    r"\b(?:my email address is|my email is|its|it's|yeah|yes|sure|um|uh|like|so|okay|ok)\b"
+)
+# "a great" is STT mishearing "at rate"
+_SPOKEN_AT_RE = re.compile(r'\b(?:at\s+the\s+rate|at\s+rate|a\s+great|at\s+sign|at\s+symbol)\b')
+_BARE_AT_RE = re.compile(r'\s+at\s+')
+_GMAIL_RE = re.compile(r'\b(?:g\s*mail|gee\s*mail|jmail)\b')
+_SPOKEN_TLDS = {
+    'couk': '.co.uk', 'com': '.com', 'net': '.net', 'org': '.org', 'edu': '.edu', 'io': '.io',
+}
+_SPOKEN_TLD_RE = re.compile(
+    r'\bdot\s*(?:(?P<couk>co\s*dot\s*uk)|(?P<com>com)|(?P<net>net)|(?P<org>org)|(?P<edu>edu)|(?P<io>io))\b'
+)
+_SPOKEN_DOT_RE = re.compile(r'\s+dot\s+')
+
+
 def _normalize_speech_for_email(speech_text: str) -> str:
     """
     Pre-process speech-to-text before sending to LLM for email extraction.
@@ -546,74 +625,31 @@ def _normalize_speech_for_email(speech_text: str) -> str:
     
     # STEP 1: Protect TLDs BEFORE aggressive period removal
     # Replace .com, .net, etc. with placeholders to preserve them
-    tld_placeholders = {
-        '.com': '___DOTCOM___',
-        '.net': '___DOTNET___',
-        '.org': '___DOTORG___',
-        '.edu': '___DOTEDU___',
-        '.io': '___DOTIO___',
-        '.co.uk': '___DOTCOUK___',
-    }
-    for tld, placeholder in tld_placeholders.items():
-        text = text.replace(tld, placeholder)
+    text = _TLD_PROTECT_RE.sub(lambda m: _TLD_PLACEHOLDERS[m.group(0)], text)
     
     # STEP 2: Remove periods and commas that sit between letters/spaces
     # This turns "s. h. i. n. y." into "s  h  i  n  y " before any other processing
     # Prevents LLM from treating periods as sentence boundaries
-    text = re.sub(r'(?<=[a-z0-9\s])[.,](?=[a-z0-9\s]|$)', ' ', text)
+    text = _INTER_LETTER_PUNCT_RE.sub(' ', text)
     
     # STEP 3: Restore TLD placeholders
-    for tld, placeholder in tld_placeholders.items():
-        text = text.replace(placeholder, tld)
-    
-    # Remove common filler words/phrases (use word boundaries to avoid partial matches)
-    filler_patterns = [
-        r'\bmy email is\b', r'\bmy email address is\b', r'\bits\b', r"\bit's\b", 
-        r'\byeah\b', r'\byes\b', r'\bsure\b', r'\bum\b', r'\buh\b', 
-        r'\blike\b', r'\bso\b', r'\bokay\b', r'\bok\b'
-    ]
-    for pattern in filler_patterns:
-        text = re.sub(pattern, ' ', text, flags=re.IGNORECASE)
-    
-    # Normalize @ symbol patterns (order matters - more specific first)
-    at_patterns = [
-        (r'\bat\s+the\s+rate\b', ' @ '),
-        (r'\bat\s+rate\b', ' @ '),
-        (r'\ba\s+great\b', ' @ '),  # "a great" misheard as "at rate"
-        (r'\bat\s+sign\b', ' @ '),
-        (r'\bat\s+symbol\b', ' @ '),
-        (r'\s+at\s+', ' @ '),
-    ]
-    for pattern, replacement in at_patterns:
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-    
-    # Normalize domain patterns
-    domain_patterns = [
-        (r'\bg\s*mail\b', 'gmail'),
-        (r'\bgee\s*mail\b', 'gmail'),
-        (r'\bjmail\b', 'gmail'),
-        (r'\byahoo\b', 'yahoo'),
-        (r'\boutlook\b', 'outlook'),
-        (r'\bhotmail\b', 'hotmail'),
-        (r'\bicloud\b', 'icloud'),
-    ]
-    for pattern, replacement in domain_patterns:
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    text = _TLD_RESTORE_RE.sub(lambda m: _TLD_RESTORED[m.group(0)], text)
+    
+    # Remove common filler words/phrases (word boundaries avoid partial matches)
+    text = _EMAIL_FILLER_RE.sub(' ', text)
+    
+    # Normalize @ symbol patterns: spoken forms first, then a bare "at"
+    text = _SPOKEN_AT_RE.sub(' @ ', text)
+    text = _BARE_AT_RE.sub(' @ ', text)
+    
+    # Normalize misheard domains: "g mail", "gee mail", "jmail" -> "gmail"
+    text = _GMAIL_RE.sub('gmail', text)
     
     # Normalize "dot com", "dot net", etc. FIRST (before letter collapsing)
-    tld_patterns = [
-        (r'\bdot\s*com\b', '.com'),
-        (r'\bdot\s*net\b', '.net'),
-        (r'\bdot\s*org\b', '.org'),
-        (r'\bdot\s*edu\b', '.edu'),
-        (r'\bdot\s*co\s*dot\s*uk\b', '.co.uk'),
-        (r'\bdot\s*io\b', '.io'),
-    ]
-    for pattern, replacement in tld_patterns:
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    text = _SPOKEN_TLD_RE.sub(lambda m: _SPOKEN_TLDS[m.lastgroup], text)
     
     # Normalize "dot" in middle of email (actual period): "john dot smith" -> "john.smith"
-    text = re.sub(r'\s+dot\s+', '.', text)
+    text = _SPOKEN_DOT_RE.sub('.', text)
     
     # Convert number words to digits — but ONLY when they appear in a numeric
     # context (e.g. "two four" in "majji two four").  In an email context,
@@ -702,9 +738,18 @@ def llm_extract_email(speech_text: str) -> str:
     Returns:
         Extracted or constructed email string. Never returns None.
     """
+    return extract_email_with_source(speech_text)[0]
+
+
+def extract_email_with_source(speech_text: str) -> tuple[str, str]:
+    """
+    llm_extract_email plus where the address came from: "regex", "llm", or
+    "fallback" (empty input, or built from the raw text after the model
+    failed). Lets the cache keep only real model answers.
+    """
     if not speech_text or not speech_text.strip():
         logger.debug("Email extract: Empty input")
-        return "customer@email.com"
+        return "customer@email.com", "fallback"
     
     # Step 1: Deterministic pre-processing (handles all STT artifacts)
     normalized = _normalize_speech_for_email(speech_text)
@@ -741,7 +786,7 @@ def llm_extract_email(speech_text: str) -> str:
         has_valid_tld = any(email.endswith(tld) for tld in _VALID_TLDS)
         if has_valid_tld:
             logger.info(f"Email extracted: '{email}'")
-            return email
+            return email, "regex"
     
     # Step 4: LLM fallback - construct email from speech
     if model:
@@ -781,7 +826,7 @@ Return ONLY the complete email address, nothing else:"""
             # Validate it looks like an email
             if '@' in email and '.' in email.split('@')[-1]:
                 logger.info(f"Email constructed by LLM: '{email}'")
-                return email
+                return email, "llm"
                 
         except Exception as e:
             logger.warning(f"LLM email extraction failed: {e}")
@@ -799,13 +844,27 @@ Return ONLY the complete email address, nothing else:"""
             domain = domain + ".com" if domain else "gmail.com"
         email = f"{username}@{domain}"
         logger.info(f"Email constructed from parts: '{email}'")
-        return email
+        return email, "fallback"
     else:
         # No @ sign - use the text as username with gmail.com
         username = clean_text if clean_text else "customer"
         email = f"{username}@gmail.com"
         logger.info(f"Email constructed with default domain: '{email}'")
-        return email
+        return email, "fallback"
+
+
+@lru_cache(maxsize=1024)
+def _keyword_intent(text_lower: str) -> tuple:
+    """
+    (intent, appliance_type, has_symptom, wants_scheduling) for the no-model
+    fallback. Pure in the lowercased text, so repeated utterances are cached.
+    """
+    appliance = _keyword_appliance(text_lower)
+    wants_scheduling = bool(_SCHEDULING_RE.search(text_lower))
+    # Check if customer described a symptom (not just named an appliance)
+    has_symptom = bool(_SYMPTOM_RE.search(text_lower))
+    intent = "schedule_technician" if wants_scheduling else ("describe_problem" if appliance else "unclear")
+    return intent, appliance, has_symptom, wants_scheduling
 
 
 def llm_analyze_customer_intent(speech_text: str) -> dict:
@@ -833,51 +892,15 @@ def llm_analyze_customer_intent(speech_text: str) -> dict:
     if not speech_text or not speech_text.strip():
         return fallback
     
-    # Quick keyword check for scheduling intent
-    text_lower = speech_text.lower()
-    scheduling_keywords = ["schedule", "technician", "appointment", "book", "visit", "come out", "send someone"]
-    wants_scheduling = any(kw in text_lower for kw in scheduling_keywords)
-    
     if not model:
         # Fallback: keyword-based analysis
-        # Check compound words first to avoid substring false matches
-        # e.g. "dishwasher" contains "washer", "air conditioner" contains "air"
-        appliance = None
-        if "dishwasher" in text_lower:
-            appliance = "dishwasher"
-        elif "air conditioner" in text_lower or "heat pump" in text_lower:
-            appliance = "hvac"
-        else:
-            for kw in APPLIANCE_KEYWORDS:
-                if kw in text_lower:
-                    if kw in ("washer", "washing"):
-                        appliance = "washer"
-                    elif kw in ("dryer", "drying"):
-                        appliance = "dryer"
-                    elif kw in ("fridge", "refrigerator", "freezer"):
-                        appliance = "refrigerator"
-                    elif kw in ("oven", "stove", "range", "cooktop"):
-                        appliance = "oven"
-                    elif kw in ("hvac", "heating", "cooling", "ac", "furnace"):
-                        appliance = "hvac"
-                    break
-        
-        # Check if customer described a symptom (not just named an appliance)
-        symptom_keywords = [
-            "not cooling", "not working", "won't start", "leaking", "broken",
-            "noise", "loud", "error", "won't turn", "not heating", "not spinning",
-            "not draining", "won't drain", "smells", "smoking", "sparking",
-            "vibrating", "shaking", "flooding", "overflowing", "beeping",
-            "flashing", "frozen", "ice", "warm", "hot", "cold",
-        ]
-        has_symptom = any(kw in text_lower for kw in symptom_keywords)
-        has_full = appliance is not None and has_symptom
+        intent, appliance, has_symptom, wants_scheduling = _keyword_intent(speech_text.lower())
         return {
-            "intent": "schedule_technician" if wants_scheduling else ("describe_problem" if appliance else "unclear"),
+            "intent": intent,
             "appliance_type": appliance,
             "symptoms": speech_text if has_symptom else None,
             "wants_scheduling": wants_scheduling,
-            "has_full_description": has_full
+            "has_full_description": appliance is not None and has_symptom
         }
     
     try:
@@ -959,10 +982,7 @@ def llm_analyze_customer_intent(speech_text: str) -> dict:
         
         # Validate appliance_type
         appliance = parsed.get("appliance_type")
-        if appliance and appliance not in VALID_APPLIANCES:
-            appliance = None
-        if appliance == "other":
-            appliance = None
+        appliance = _CANONICAL_APPLIANCES.get(appliance) if isinstance(appliance, str) else None
         
         result_dict = {
             "intent": parsed.get("intent", "unclear"),
@@ -980,27 +1000,9 @@ def llm_analyze_customer_intent(speech_text: str) -> dict:
         
         # Robust keyword fallback when LLM JSON parsing fails
         text_lower = speech_text.lower()
-        kw_appliance = None
-        if "dishwasher" in text_lower:
-            kw_appliance = "dishwasher"
-        elif "air conditioner" in text_lower:
-            kw_appliance = "hvac"
-        else:
-            for kw in APPLIANCE_KEYWORDS:
-                if kw in text_lower:
-                    if kw in ("washer", "washing"):
-                        kw_appliance = "washer"
-                    elif kw in ("dryer", "drying"):
-                        kw_appliance = "dryer"
-                    elif kw in ("fridge", "refrigerator", "freezer"):
-                        kw_appliance = "refrigerator"
-                    elif kw in ("oven", "stove", "range", "cooktop"):
-                        kw_appliance = "oven"
-                    elif kw in ("hvac", "heating", "cooling", "ac", "furnace"):
-                        kw_appliance = "hvac"
-                    break
+        kw_appliance = _keyword_appliance(text_lower)
         
-        kw_scheduling = any(kw in text_lower for kw in ["schedule", "technician", "appointment", "book", "visit", "come out", "send someone"])
+        kw_scheduling = bool(_SCHEDULING_RE.search(text_lower))
         kw_has_detail = len(speech_text.split()) > 8
         
         kw_result = {
@@ -1076,6 +1078,36 @@ Return ONLY "yes" or "no":"""
     return current_step
 
 
+@lru_cache(maxsize=64)
+def _generate_troubleshooting_steps(appliance_type: str, symptom_summary: str) -> str:
+    """
+    Cached generation keyed by (appliance, symptom). Raises on failure so
+    that errors and unusable output are never memoized.
+    """
+    symptom_ctx = f' The reported issue is: "{symptom_summary}".' if symptom_summary else ""
+    prompt = (
+        f"You are a home appliance repair expert. Generate exactly 3 quick "
+        f"troubleshooting steps a customer can try RIGHT NOW for their "
+        f"{appliance_type}.{symptom_ctx}\n\n"
+        "Rules:\n"
+        "- Each step must be a single clear sentence the customer can act on immediately\n"
+        "- Use simple language suitable for reading aloud on a phone call\n"
+        "- Focus on the most common fixes for this appliance and symptom\n"
+        "- Do NOT include safety warnings or disclaimers\n"
+        "- Format: Step 1: ... Step 2: ... Step 3: ...\n\n"
+        "Steps:"
+    )
+    result = model.generate_content(
+        prompt,
+        generation_config={"temperature": 0.2, "max_output_tokens": 200},
+    )
+    raw = result.text.strip()
+    # Ensure it starts with "Step 1"
+    if "Step 1" not in raw:
+        raise ValueError(f"Unexpected troubleshooting format: {raw[:60]}")
+    return raw
+
+
 def llm_generate_troubleshooting_steps(appliance_type: str, symptom_summary: str = "") -> str:
     """
     Use LLM to generate appliance-specific troubleshooting steps instead of
@@ -1085,34 +1117,24 @@ def llm_generate_troubleshooting_steps(appliance_type: str, symptom_summary: str
     if not model:
         return ""
 
-    symptom_ctx = f' The reported issue is: "{symptom_summary}".' if symptom_summary else ""
     try:
-        prompt = (
-            f"You are a home appliance repair expert. Generate exactly 3 quick "
-            f"troubleshooting steps a customer can try RIGHT NOW for their "
-            f"{appliance_type}.{symptom_ctx}\n\n"
-            "Rules:\n"
-            "- Each step must be a single clear sentence the customer can act on immediately\n"
-            "- Use simple language suitable for reading aloud on a phone call\n"
-            "- Focus on the most common fixes for this appliance and symptom\n"
-            "- Do NOT include safety warnings or disclaimers\n"
-            "- Format: Step 1: ... Step 2: ... Step 3: ...\n\n"
-            "Steps:"
-        )
-        result = model.generate_content(
-            prompt,
-            generation_config={"temperature": 0.2, "max_output_tokens": 200},
+        return _generate_troubleshooting_steps(
+            (appliance_type or "appliance").strip().lower(),
+            (symptom_summary or "").strip(),
         )
-        raw = result.text.strip()
-        # Ensure it starts with "Step 1"
-        if "Step 1" not in raw:
-            return ""
-        return raw
     except Exception as e:
         logger.error(f"Troubleshooting generation failed: {e}")
         return ""
 
 
+# Bare one-word confirmations make up most replies to yes/no prompts; a set
+# lookup on the stripped utterance answers them without the keyword scan or
+# an LLM round trip.
+_YES_FAST = frozenset({"yes", "yeah", "yep", "yup", "correct", "right", "sure", "ok", "okay"})
+_NO_FAST = frozenset({"no", "nope", "nah", "negative", "incorrect", "wrong"})
+_REPLY_PUNCT = ".,!? "
+
+
 def llm_classify_yes_no(user_text: str, context: str = "") -> dict:
     """
     Universal LLM-powered yes/no/correction classifier.
@@ -1128,6 +1150,12 @@ def llm_classify_yes_no(user_text: str, context: str = "") -> dict:
     if not user_text or not user_text.strip():
         return fallback
 
+    bare = user_text.strip().lower().strip(_REPLY_PUNCT)
+    if bare in _YES_FAST:
+        return {"intent": "yes", "correction_value": None}
+    if bare in _NO_FAST:
+        return {"intent": "no", "correction_value": None}
+
     # Lightweight keyword fallback when LLM model is unavailable (tests, no API key)
     if not model:
         text_lower = user_text.lower().strip()
@@ -1179,6 +1207,40 @@ Return ONLY valid JSON:
         return fallback
 
 
+_WORD_RE = re.compile(r"\b[\w']+\b")
+
+
+def _split_hints(hints: list[str]) -> tuple[frozenset, tuple]:
+    """Split keyword hints into single words (token match) and multi-word phrases (substring match)."""
+    return (
+        frozenset(h for h in hints if " " not in h),
+        tuple(h for h in hints if " " in h),
+    )
+
+
+# Generic keyword hints per common choice labels (keyword fallback for llm_classify_user_intent).
+# Single words are matched against whole tokens so "one" no longer fires on "someone".
+_CHOICE_HINTS = {
+    choice: _split_hints(hints)
+    for choice, hints in {
+        "troubleshoot": ["troubleshoot", "try", "steps", "fix myself", "diagnose"],
+        "schedule": ["schedule", "technician", "technicians", "appointment", "book", "visit", "send someone"],
+        "callback": ["call back", "later", "not now", "another time", "goodbye"],
+        "photo": ["photo", "picture", "image", "upload"],
+        "resolved": ["fixed", "worked", "helped", "resolved", "all good"],
+        "not_resolved": ["not working", "didn't help", "still broken", "same issue"],
+        "cancel": ["cancel", "never mind", "hang up", "goodbye"],
+        "select_slot": ["option", "first", "second", "third", "one", "two", "three"],
+        "done": ["done", "uploaded", "finished", "sent"],
+        "skip": ["skip", "schedule", "technician", "forget"],
+        "more_time": ["wait", "more time", "minute", "hold on", "not yet"],
+        "resend": ["resend", "send again", "another email", "didn't get"],
+        "describe_problem": ["not working", "broken", "issue", "problem", "error"],
+        "unsure": ["don't know", "not sure", "no idea"],
+    }.items()
+}
+
+
 def llm_classify_user_intent(user_text: str, choices: list[str], context: str = "") -> dict:
     """
     Universal LLM-powered multi-choice intent classifier.
@@ -1199,26 +1261,10 @@ def llm_classify_user_intent(user_text: str, choices: list[str], context: str =
     # Lightweight keyword fallback when LLM model is unavailable (tests, no API key)
     if not model:
         text_lower = user_text.lower()
-        # Generic keyword hints per common choice labels
-        _choice_hints = {
-            "troubleshoot": ["troubleshoot", "try", "steps", "fix myself", "diagnose"],
-            "schedule": ["schedule", "technician", "appointment", "book", "visit", "send someone"],
-            "callback": ["call back", "later", "not now", "another time", "goodbye"],
-            "photo": ["photo", "picture", "image", "upload"],
-            "resolved": ["fixed", "worked", "helped", "resolved", "all good"],
-            "not_resolved": ["not working", "didn't help", "still broken", "same issue"],
-            "cancel": ["cancel", "never mind", "hang up", "goodbye"],
-            "select_slot": ["option", "first", "second", "third", "one", "two", "three"],
-            "done": ["done", "uploaded", "finished", "sent"],
-            "skip": ["skip", "schedule", "technician", "forget"],
-            "more_time": ["wait", "more time", "minute", "hold on", "not yet"],
-            "resend": ["resend", "send again", "another email", "didn't get"],
-            "describe_problem": ["not working", "broken", "issue", "problem", "error"],
-            "unsure": ["don't know", "not sure", "no idea"],
-        }
+        tokens = frozenset(_WORD_RE.findall(text_lower))
         for c in choices:
-            hints = _choice_hints.get(c, [])
-            if any(h in text_lower for h in hints):
+            words, phrases = _CHOICE_HINTS.get(c, (frozenset(), ()))
+            if tokens & words or any(p in text_lower for p in phrases):
                 return {"choice": c, "confidence": 0.75}
         return fallback
 
@@ -1306,6 +1352,13 @@ ZIP code:"""
         return None
 
 
+# Replies that are nothing but the period itself skip the model; anything
+# longer ("early afternoon", "later in the morning") needs the LLM's reading
+_TIME_PREF_WORDS = {"morning": "morning", "afternoon": "afternoon", "evening": "afternoon"}
+# Whole-word keyword fallback; one scan instead of an `in` test per keyword
+_TIME_PREF_RE = re.compile(r"\b(morning|afternoon|evening)s?\b")
+
+
 def llm_extract_time_preference(speech_text: str) -> str | None:
     """
     Use LLM to extract morning/afternoon preference from natural speech.
@@ -1313,13 +1366,12 @@ def llm_extract_time_preference(speech_text: str) -> str | None:
     """
     if not speech_text or not speech_text.strip():
         return None
+    whole_reply = speech_text.strip().lower().strip(_REPLY_PUNCT)
+    if whole_reply in _TIME_PREF_WORDS:
+        return _TIME_PREF_WORDS[whole_reply]
     if not model:
-        text_lower = speech_text.lower()
-        if "morning" in text_lower:
-            return "morning"
-        if "afternoon" in text_lower or "evening" in text_lower:
-            return "afternoon"
-        return None
+        match = _TIME_PREF_RE.search(speech_text.lower())
+        return _TIME_PREF_WORDS[match.group(1)] if match else None
 
     try:
         prompt = f"""The caller was asked if they prefer a morning or afternoon appointment.
@@ -1347,13 +1399,45 @@ Return ONLY one word: morning, afternoon, anytime, or unclear"""
         return None
 
 
+_SLOT_INDEX = {
+    "1": 0, "1st": 0, "one": 0, "first": 0,
+    "2": 1, "2nd": 1, "two": 1, "second": 1,
+    "3": 2, "3rd": 2, "three": 2, "third": 2,
+}
+_SLOT_WORD = r"(1st|2nd|3rd|[123]|one|two|three|first|second|third)"
+# "option 2" / "number three" anywhere in the utterance
+_SLOT_OPTION_RE = re.compile(rf"\b(?:option|number)\s+{_SLOT_WORD}\b", re.IGNORECASE)
+# The whole utterance is just an ordinal: "2", "the first one", "second please"
+_SLOT_BARE_RE = re.compile(
+    rf"^\W*(?:the\s+)?{_SLOT_WORD}(?:\s+one)?(?:\s+please)?\W*$", re.IGNORECASE
+)
+
+
+def _fast_choose_slot(speech_text: str) -> int | None:
+    """
+    Resolve unambiguous option picks without the model. Bare digits inside
+    longer sentences ("the 1 PM slot") are left to the LLM, since they may
+    name a time rather than an option number.
+    """
+    bare = _SLOT_BARE_RE.match(speech_text)
+    if bare:
+        return _SLOT_INDEX[bare.group(1).lower()]
+    picks = {_SLOT_INDEX[m.lower()] for m in _SLOT_OPTION_RE.findall(speech_text)}
+    if len(picks) == 1:
+        return picks.pop()
+    return None
+
+
 def llm_choose_slot(speech_text: str, slots_description: str) -> int | None:
     """
     Use LLM to match the caller's slot selection to one of the offered slots.
-    Returns 0-based index or None.
+    Plain option picks are matched by regex first. Returns 0-based index or None.
     """
     if not speech_text or not speech_text.strip():
         return None
+    fast_index = _fast_choose_slot(speech_text)
+    if fast_index is not None:
+        return fast_index
     if not model:
         return None
 
@@ -1604,14 +1688,63 @@ JSON:"""
         return fallback
 
 
+# Fast path for llm_extract_symptoms: utterances that are just an error code
+# ("it says F21", "the display shows F 21") don't need an LLM round trip.
+# A space between letter and digits needs two digits, so "u 2" isn't a code.
+_ERROR_CODE_RE = re.compile(r"\b([EFLU])(?:-?(\d{1,3})|\s(\d{2,3}))\b", re.IGNORECASE)
+_ERROR_CODE_FILLER = frozenset({
+    "a", "an", "the", "it", "it's", "its", "there's", "i", "i'm", "my", "and", "just",
+    "um", "uh", "so", "says", "say", "saying", "said", "shows", "showing", "displays",
+    "displaying", "is", "on", "screen", "display", "error", "code", "codes", "get",
+    "got", "getting", "see", "seeing", "keeps", "keep", "giving", "me", "now",
+})
+
+
+def _find_error_codes(user_text: str) -> list[str]:
+    """Normalized, de-duplicated error codes ("f 21" -> "F21") in order of mention."""
+    return list(dict.fromkeys(
+        f"{m.group(1).upper()}{m.group(2) or m.group(3)}" for m in _ERROR_CODE_RE.finditer(user_text)
+    ))
+
+
+def _fast_extract_symptoms(user_text: str, codes: list[str]) -> dict | None:
+    """
+    Regex-only symptom extraction when the utterance is nothing but error
+    codes and filler words; None when anything else was said.
+    """
+    if not codes:
+        return None
+    rest = _ERROR_CODE_RE.sub(" ", user_text).lower().split()
+    if not all(word.strip(_REPLY_PUNCT) in _ERROR_CODE_FILLER for word in rest):
+        return None
+    return {
+        "symptom_summary": f"It's showing error code {', '.join(codes)}",
+        "error_codes": codes,
+        "is_urgent": False,
+    }
+
+
+def _merge_error_codes(extracted: dict, codes: list[str]) -> dict:
+    """Append regex-found codes the extractor missed, so "leaks, code E5" keeps E5."""
+    known = {str(code).upper().replace("-", "").replace(" ", "") for code in extracted["error_codes"]}
+    extracted["error_codes"] = list(extracted["error_codes"]) + [c for c in codes if c not in known]
+    return extracted
+
+
 def llm_extract_symptoms(user_text: str) -> dict:
     """
     Uses Gemini to extract structured symptom information from user text.
     Returns dict with: symptom_summary, error_codes, is_urgent.
     """
+    codes = _find_error_codes(user_text or "")
+    fast = _fast_extract_symptoms(user_text or "", codes)
+    if fast:
+        logger.debug(f"Symptoms from error-code fast path: {fast['error_codes']}")
+        return fast
+    
     fallback = {
         "symptom_summary": user_text,
-        "error_codes": [],
+        "error_codes": codes,
         "is_urgent": False
     }
     
@@ -1670,11 +1803,11 @@ Caller description:
         
         data = json.loads(raw)
         
-        extracted = {
+        extracted = _merge_error_codes({
             "symptom_summary": data.get("symptom_summary") or user_text,
             "error_codes": data.get("error_codes") or [],
             "is_urgent": bool(data.get("is_urgent"))
-        }
+        }, codes)
         
         logger.debug(f"Symptom extraction parsed: {extracted}")
         return extracted
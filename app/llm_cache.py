@@ -0,0 +1,102 @@
+"""
+In-process cache in front of hot-path LLM interpretation calls.
+
+Customer replies during troubleshooting cluster into a handful of phrasings
+("no it didn't work", "that fixed it"), so an exact-match cache on the
+normalized utterance skips the Gemini round trip for repeats. Email
+retries are cached the same way, keyed on the email-normalized speech.
+"""
+import hashlib
+import re
+
+from .llm import (
+    llm_interpret_troubleshooting_response,
+    extract_email_with_source,
+    _normalize_speech_for_email,
+)
+from .image_service import validate_email
+from .logging_config import get_logger
+from .ttl_cache import TTLCache
+
+logger = get_logger("llm_cache")
+
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 1024
+
+_NON_WORD_RE = re.compile(r"[^\w\s']+")
+_SPACE_RE = re.compile(r"\s+")
+
+_interpret_cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+_email_cache = TTLCache(max_entries=2048, ttl_seconds=CACHE_TTL_SECONDS)
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _SPACE_RE.sub(" ", _NON_WORD_RE.sub(" ", text.lower())).strip()
+
+
+def _cache_key(speech_text: str, troubleshooting_step: str) -> str:
+    steps_hash = hashlib.sha256((troubleshooting_step or "").encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{_normalize(speech_text)}|{steps_hash}".encode("utf-8")).hexdigest()
+
+
+def cached_llm_interpret(speech_text: str, troubleshooting_step: str) -> dict:
+    """
+    Cached wrapper around llm_interpret_troubleshooting_response.
+    Only high-confidence answers are stored, so keyword/error fallbacks
+    (which never report "high") are always recomputed.
+    """
+    if not speech_text or not speech_text.strip():
+        return llm_interpret_troubleshooting_response(speech_text, troubleshooting_step)
+
+    key = _cache_key(speech_text, troubleshooting_step)
+    cached = _interpret_cache.get(key)
+    if cached is not None:
+        logger.debug(f"Troubleshoot interpretation cache hit: '{speech_text[:60]}'")
+        return dict(cached)
+
+    result = llm_interpret_troubleshooting_response(speech_text, troubleshooting_step)
+
+    if result.get("confidence") == "high":
+        _interpret_cache.put(key, dict(result))
+    return result
+
+
+def cached_llm_extract_email(speech_text: str) -> str:
+    """
+    Cached wrapper around llm_extract_email, keyed on the email-normalized
+    speech so retries that differ only in STT casing/punctuation
+    ("K. A. S. I at gmail" vs "k a s i at gmail") reuse the first result.
+    Like interpretations, only trusted answers are stored: a valid address
+    from the model. Regex hits are cheap to redo, and last-resort
+    constructions must not outlive a transient API error.
+    """
+    if not speech_text or not speech_text.strip():
+        return extract_email_with_source(speech_text)[0]
+
+    key = _normalize_speech_for_email(speech_text)
+    cached = _email_cache.get(key)
+    if cached is not None:
+        logger.debug(f"Email extraction cache hit: '{speech_text[:60]}'")
+        return cached
+
+    email, source = extract_email_with_source(speech_text)
+    if source == "llm" and validate_email(email):
+        _email_cache.put(key, email)
+    return email
+
+
+def forget_cached_email(speech_text: str) -> None:
+    """Drop the cached extraction for this speech once the caller rejects the read-back."""
+    if speech_text and speech_text.strip():
+        _email_cache.discard(_normalize_speech_for_email(speech_text))
+
+
+def clear_interpret_cache():
+    """Drop all cached interpretations."""
+    _interpret_cache.clear()
+
+
+def clear_email_cache():
+    """Drop all cached email extractions."""
+    _email_cache.clear()
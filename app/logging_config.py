@@ -6,6 +6,8 @@ Features:
 - Colored console output for development
 - Call context tracking (call_sid, step, speaker)
 - Log levels: DEBUG, INFO, WARNING, ERROR, CRITICAL
+- Records are queued and written by a background listener thread, so
+  request handlers never block on stdout/file I/O
 
 Usage:
     from .logging_config import get_logger, log_conversation, log_error
@@ -13,13 +15,21 @@ Usage:
     logger = get_logger("twilio")
     logger.info("Message", extra={"call_sid": call_sid})
     
+    bind_call_context(call_sid, step="greet")  # later records carry call_sid/step
+    logger.info("Message")
+    
     log_conversation(call_sid, "AGENT", "Hello!", step="greet")
 """
 
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import sys
 import json
 import os
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Optional
 
@@ -29,7 +39,7 @@ class JSONFormatter(logging.Formatter):
     
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -50,9 +60,11 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, "extra_data") and record.extra_data:
             log_data["data"] = record.extra_data
             
-        # Include exception info if present
+        # Include exception info if present (pre-rendered when the record was queued)
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
             
         return json.dumps(log_data)
 
@@ -95,7 +107,8 @@ class ConsoleFormatter(logging.Formatter):
         
         context = f" [{', '.join(context_parts)}]" if context_parts else ""
         
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        # record.created, not now(): records are formatted later on the listener thread
+        timestamp = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
         
         # Special formatting for conversation logs
         if speaker:
@@ -108,15 +121,29 @@ class ConsoleFormatter(logging.Formatter):
         return f"{color}[{timestamp}] {record.levelname:8}{self.RESET}{context} {record.getMessage()}"
 
 
+# Per-request call context (set via bind_call_context); asyncio tasks and
+# asyncio.to_thread workers each see the value of the request they serve.
+_call_context: ContextVar[tuple[str, str]] = ContextVar("call_context", default=("", ""))
+
+
+def bind_call_context(call_sid: str, step: str = "") -> None:
+    """
+    Bind call_sid/step to every record logged while handling the current request,
+    so call sites don't need to pass extra={"call_sid": ..., "step": ...}.
+    Explicit extra values still take precedence.
+    """
+    _call_context.set((call_sid or "", step or ""))
+
+
 class CallContextFilter(logging.Filter):
-    """Filter that adds default values for call context fields."""
+    """Filter that fills call context fields from the bound context (or empty defaults)."""
     
     def filter(self, record: logging.LogRecord) -> bool:
         # Ensure all context fields exist (even if empty)
-        if not hasattr(record, "call_sid"):
-            record.call_sid = ""
-        if not hasattr(record, "step"):
-            record.step = ""
+        if not getattr(record, "call_sid", ""):
+            record.call_sid = _call_context.get()[0]
+        if not getattr(record, "step", ""):
+            record.step = _call_context.get()[1]
         if not hasattr(record, "speaker"):
             record.speaker = ""
         if not hasattr(record, "extra_data"):
@@ -124,6 +151,36 @@ class CallContextFilter(logging.Filter):
         return True
 
 
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that freezes a record for the listener thread without
+    formatting it: the message is merged with its args and any traceback is
+    rendered to exc_text, but the real formatters still run on the listener.
+    Call context is filled in before enqueueing (see setup_logging), since the
+    listener thread cannot see the request's ContextVar.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 def setup_logging(
     log_level: str = "INFO",
     json_format: bool = False,
@@ -160,14 +217,29 @@ def setup_logging(
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.DEBUG)
     console_handler.stream = sys.stdout  # Ensure stdout
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # File handler (optional)
     if log_file:
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(JSONFormatter())  # Always JSON for files
         file_handler.setLevel(logging.DEBUG)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Real handlers run on a listener thread; the app logger only enqueues.
+    # The context filter sits on the queue handler so records from child
+    # loggers (voice_agent.twilio, ...) pick up call context on the request's thread.
+    _stop_queue_listener()
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _ContextQueueHandler(log_queue)
+    queue_handler.addFilter(context_filter)
+    logger.addHandler(queue_handler)
+    
+    global _queue_listener
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _queue_listener.start()
     
     # Prevent propagation to root logger
     logger.propagate = False
@@ -186,6 +258,7 @@ _root_logger = setup_logging(
     json_format=_LOG_FORMAT_JSON,
     log_file=_LOG_FILE
 )
+atexit.register(_stop_queue_listener)
 
 
 def get_logger(name: str = "") -> logging.Logger:
@@ -207,6 +280,9 @@ def get_logger(name: str = "") -> logging.Logger:
 # Convenience functions for structured logging
 # =============================================================================
 
+_conversation_logger = get_logger("conversation")
+
+
 def log_conversation(call_sid: str, speaker: str, message: str, step: str = ""):
     """
     Log conversation turns (agent/customer speech).
@@ -217,8 +293,10 @@ def log_conversation(call_sid: str, speaker: str, message: str, step: str = ""):
         message: The spoken text
         step: Current conversation step
     """
-    logger = get_logger("conversation")
-    logger.info(
+    # Called several times per turn: skip building the record when INFO is filtered out
+    if not _conversation_logger.isEnabledFor(logging.INFO):
+        return
+    _conversation_logger.info(
         message,
         extra={"call_sid": call_sid, "speaker": speaker, "step": step}
     )
@@ -1,29 +1,41 @@
 # Run with: uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
 
-from pathlib import Path
+import asyncio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 from starlette.websockets import WebSocket
 
 from app.twilio_routes import router as twilio_router
-from app.upload_routes import router as upload_router
+from app.upload_routes import router as upload_router, STATIC_DIR, UPLOAD_DIR, ensure_upload_dir
 from .db import Base, engine
 from . import models
 from .seed import seed_data
 from .stt_stream import handle_media_stream
 from .logging_config import get_logger
+from .vision import warmup_vision
 
 logger = get_logger("main")
 
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles for content-versioned URLs (?v=<hash>), cacheable for a year."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
 app = FastAPI(title="Sears Home Services Voice AI Agent")
 
 app.include_router(twilio_router, prefix="/twilio")
 app.include_router(upload_router)
 
-UPLOAD_DIR = Path("./uploads")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# StaticFiles checks the directory at mount time, so create it first
+ensure_upload_dir()
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+app.mount("/static", CachedStaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
 @app.on_event("startup")
@@ -34,6 +46,12 @@ def on_startup():
     logger.info("✅ Database initialized and seeded")
 
 
+@app.on_event("startup")
+async def warm_up_vision():
+    # In the background so a slow network never delays accepting calls
+    app.state.vision_warmup = asyncio.create_task(warmup_vision())
+
+
 @app.websocket("/twilio/media-stream")
 async def media_stream_endpoint(websocket: WebSocket):
     """Twilio Media Streams WebSocket endpoint for real-time STT."""
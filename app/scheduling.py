@@ -1,11 +1,31 @@
 from sqlalchemy import func, select
 from .db import SessionLocal
 from .models import AvailabilitySlot, Appointment, TechnicianServiceArea, TechnicianSpecialty, Technician
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
 from .logging_config import get_logger
 
 logger = get_logger("scheduling")
 
+# Availability barely changes second to second; collect_time_pref and the
+# choose_slot retry path can share one query per (zip, appliance, pref, limit).
+SLOTS_CACHE_TTL_SECONDS = 45
+SLOTS_CACHE_MAX_ENTRIES = 1024
+# key -> (expires_at, tuple of slot dicts)
+_slots_cache: dict[tuple, tuple[float, tuple]] = {}
+_slots_cache_lock = threading.Lock()
+# slot_id -> slot dict, so call state only has to carry the offered IDs
+_slot_details_cache: dict[int, dict] = {}
+
+
+def clear_slots_cache():
+    """Drop all cached slot lookups (called after a booking changes availability)."""
+    with _slots_cache_lock:
+        _slots_cache.clear()
+        _slot_details_cache.clear()
+
 
 def find_available_slots(zip_code: str, appliance_type: str, time_preference: str = None, limit: int = 3):
     """
@@ -18,8 +38,15 @@ def find_available_slots(zip_code: str, appliance_type: str, time_preference: st
         limit: Maximum number of slots to return
     
     Returns:
-        List of available slot dictionaries
+        List of available slot dictionaries (fresh copies; safe to mutate)
     """
+    key = (zip_code, appliance_type, time_preference, limit)
+    now = time.monotonic()
+    with _slots_cache_lock:
+        entry = _slots_cache.get(key)
+    if entry and entry[0] > now:
+        return [dict(slot) for slot in entry[1]]
+    
     db = SessionLocal()
     try:
         # Query available slots matching ZIP code and appliance specialty
@@ -72,6 +99,11 @@ def find_available_slots(zip_code: str, appliance_type: str, time_preference: st
                     break
         
         logger.info(f"Found {len(results)} slots for ZIP={zip_code}, appliance={appliance_type}, pref={time_preference}")
+        with _slots_cache_lock:
+            if len(_slots_cache) >= SLOTS_CACHE_MAX_ENTRIES:
+                _slots_cache.clear()
+            _slots_cache[key] = (now + SLOTS_CACHE_TTL_SECONDS, tuple(dict(slot) for slot in results))
+            _remember_slot_details(results)
         return results
     except Exception as e:
         logger.error(f"Error finding slots: {e}", exc_info=True)
@@ -80,6 +112,69 @@ def find_available_slots(zip_code: str, appliance_type: str, time_preference: st
         db.close()
 
 
+def _remember_slot_details(slots) -> None:
+    """Record slot details by ID; caller holds _slots_cache_lock."""
+    if len(_slot_details_cache) >= SLOTS_CACHE_MAX_ENTRIES:
+        _slot_details_cache.clear()
+    for slot in slots:
+        _slot_details_cache[slot["slot_id"]] = dict(slot)
+
+
+def get_slots_by_ids(slot_ids) -> list:
+    """
+    Look up offered slots by ID, preserving the order of slot_ids.
+    
+    Slot details from a recent find_available_slots call are served from
+    memory, but their is_booked flag is re-read (a single indexed ID query),
+    since another worker may have booked them. Anything not in memory is read
+    back from the database. IDs that no longer exist or are already booked
+    come back as None, so "option 2" still lines up with the second offered slot.
+    
+    Returns:
+        List the same length as slot_ids: slot dictionaries in the same shape
+        as find_available_slots, or None for unavailable slots
+    """
+    with _slots_cache_lock:
+        found = {sid: dict(_slot_details_cache[sid]) for sid in slot_ids if sid in _slot_details_cache}
+    missing = [sid for sid in slot_ids if sid not in found]
+    fetched = []
+    db = SessionLocal()
+    try:
+        if found:
+            booked = [
+                sid for (sid,) in db.query(AvailabilitySlot.id).filter(
+                    AvailabilitySlot.id.in_(list(found)),
+                    AvailabilitySlot.is_booked == True,
+                ).all()
+            ]
+            for sid in booked:
+                del found[sid]
+        if missing:
+            fetched = [
+                {
+                    "slot_id": slot.id,
+                    "technician_name": slot.technician.name,
+                    "technician_id": slot.technician.id,
+                    "start_time": slot.start_time,
+                    "end_time": slot.end_time
+                }
+                for slot in db.query(AvailabilitySlot).filter(
+                    AvailabilitySlot.id.in_(missing),
+                    AvailabilitySlot.is_booked == False,
+                ).all()
+            ]
+    except Exception as e:
+        # Cached slots stay on offer; book_appointment still refuses a double booking
+        logger.error(f"Error fetching slots {slot_ids}: {e}", exc_info=True)
+    finally:
+        db.close()
+    if fetched:
+        with _slots_cache_lock:
+            _remember_slot_details(fetched)
+        found.update((slot["slot_id"], slot) for slot in fetched)
+    return [found.get(sid) for sid in slot_ids]
+
+
 def book_appointment(call_sid: str, customer_phone: str, zip_code: str, appliance_type: str,
                      symptom_summary: str, error_codes: list, is_urgent: bool, chosen_slot_id: int):
     """
@@ -126,6 +221,8 @@ def book_appointment(call_sid: str, customer_phone: str, zip_code: str, applianc
         db.add(appt)
         db.commit()
         db.refresh(appt)
+        # The slot may be cached under several ZIPs the technician serves
+        clear_slots_cache()
         
         # Get technician name for return
         tech_name = slot.technician.name
@@ -145,19 +242,22 @@ def book_appointment(call_sid: str, customer_phone: str, zip_code: str, applianc
         db.close()
 
 
+def format_slot_hour(start: datetime) -> str:
+    """Spoken 12-hour clock time, e.g. "9 AM" or "12 PM" (no platform-specific %-I)."""
+    return f"{start.hour % 12 or 12} {'AM' if start.hour < 12 else 'PM'}"
+
+
 def format_slot_for_speech(slot: dict, option_number: int) -> str:
     """Format a slot dictionary for text-to-speech output."""
-    start = slot["start_time"]
-    day_name = start.strftime("%A")
-    date_str = start.strftime("%B %d")
-    
-    hour = start.hour
-    if hour < 12:
-        time_of_day = "morning"
-        time_str = f"{hour} AM" if hour > 0 else "12 AM"
-    else:
-        time_of_day = "afternoon"
-        hour_12 = hour - 12 if hour > 12 else hour
-        time_str = f"{hour_12} PM" if hour_12 > 0 else "12 PM"
-    
-    return f"Option {option_number}: {day_name}, {date_str}, {time_of_day} at {time_str} with {slot['technician_name']}"
+    return _format_slot_speech(slot["start_time"], slot["technician_name"], option_number)
+
+
+@lru_cache(maxsize=256)
+def _format_slot_speech(start: datetime, technician_name: str, option_number: int) -> str:
+    # Keyed on the hashable slot fields: the same slots are re-offered across
+    # calls in one ZIP/appliance, and again when a caller asks to hear them.
+    time_of_day = "morning" if start.hour < 12 else "afternoon"
+    return (
+        f"Option {option_number}: {start.strftime('%A, %B %d')}, {time_of_day} "
+        f"at {format_slot_hour(start)} with {technician_name}"
+    )
@@ -58,6 +58,10 @@ TECHNICIANS_DATA = [
      ["30301", "75201"], ["oven", "washer"]),
 ]
 
+# Column views of TECHNICIANS_DATA, built once: per-field sweeps (uniqueness,
+# coverage) read one tuple instead of unpacking every row
+TECH_NAMES, TECH_PHONES, TECH_EMAILS, TECH_ZIPS, TECH_SPECIALTIES = zip(*TECHNICIANS_DATA)
+
 # ZIP codes covered (10 total across 5 metro areas):
 # - Chicago: 60115, 60601, 60602, 60611
 # - New York: 10001, 10002, 11201
@@ -88,10 +92,10 @@ def seed_data():
                 logger.info("Data already exists, skipping seed.")
                 return
 
-            technicians = []
-            for name, phone, email, _, _ in TECHNICIANS_DATA:
-                tech = Technician(name=name, phone=phone, email=email)
-                technicians.append(tech)
+            technicians = [
+                Technician(name=name, phone=phone, email=email)
+                for name, phone, email in zip(TECH_NAMES, TECH_PHONES, TECH_EMAILS)
+            ]
             
             db.add_all(technicians)
             db.commit()
@@ -104,8 +108,8 @@ def seed_data():
             service_areas = []
             specialties = []
             
-            for i, (_, _, _, zip_codes, appliance_types) in enumerate(TECHNICIANS_DATA):
-                tech_id = technicians[i].id
+            for tech, zip_codes, appliance_types in zip(technicians, TECH_ZIPS, TECH_SPECIALTIES):
+                tech_id = tech.id
                 for zip_code in zip_codes:
                     service_areas.append(TechnicianServiceArea(technician_id=tech_id, zip_code=zip_code))
                 for appliance_type in appliance_types:
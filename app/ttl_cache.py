@@ -0,0 +1,43 @@
+"""
+Small in-process cache shared by the LLM and vision result caches.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU dict whose entries expire ttl_seconds after they are stored."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self._entries[key]
+        return None
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
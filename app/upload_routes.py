@@ -2,20 +2,29 @@
 Tier 3: Image Upload Routes
 GET and POST handlers for the image upload flow.
 """
+import asyncio
+import hashlib
 import os
-import shutil
+from functools import lru_cache
+from string import Template
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse
+from typing import Optional
+
+import aiofiles
+from fastapi import APIRouter, BackgroundTasks, Request, UploadFile, File, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 
 from html import escape as html_escape
+from urllib.parse import quote
 from .image_service import (
     get_upload_token,
     is_token_valid,
     mark_token_used,
-    update_token_analysis
+    update_token_analysis,
+    notify_upload_complete,
 )
-from .vision import analyze_image_with_gemini
+from .config import GEMINI_MAX_PARALLEL
+from .vision import analyze_image_with_gemini_async, fallback_analysis
 from .logging_config import get_logger
 
 logger = get_logger("upload")
@@ -23,171 +32,38 @@ logger = get_logger("upload")
 router = APIRouter()
 
 UPLOAD_DIR = Path("./uploads")
+# Page stylesheets, mounted at /static by app.main with a long-lived Cache-Control
+STATIC_DIR = Path(__file__).parent / "static"
 ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB per read/write while streaming to disk
+VISION_MAX_CONCURRENCY = GEMINI_MAX_PARALLEL
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
 
+# Bounds concurrent Gemini vision calls across all background analyses
+_vision_semaphore = asyncio.Semaphore(VISION_MAX_CONCURRENCY)
 
-def ensure_upload_dir():
-    """Ensure the uploads directory exists."""
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+def _static_url(filename: str) -> str:
+    """URL for a file in STATIC_DIR, versioned by content so it can be cached forever."""
+    digest = hashlib.sha256((STATIC_DIR / filename).read_bytes()).hexdigest()[:12]
+    return f"/static/{filename}?v={digest}"
 
-@router.get("/upload/{token}", response_class=HTMLResponse)
-async def upload_form(token: str):
-    """
-    GET /upload/{token}
-    Display the image upload form if token is valid.
-    """
-    upload_token = get_upload_token(token)
-    
-    if not upload_token:
-        return HTMLResponse(content=error_page("Invalid Link", 
-            "This upload link is invalid or does not exist."), status_code=404)
-    
-    if not is_token_valid(upload_token):
-        if upload_token.used_at:
-            return HTMLResponse(content=error_page("Already Used",
-                "This upload link has already been used. Check your email for the analysis results."), status_code=410)
-        else:
-            return HTMLResponse(content=error_page("Link Expired",
-                "This upload link has expired. Please call us again to get a new link."), status_code=410)
-    
-    appliance_text = f" for your {html_escape(upload_token.appliance_type)}" if upload_token.appliance_type else ""
-    
-    return HTMLResponse(content=f"""
+
+def _page_template(css_file: str, page: str) -> Template:
+    """Template for a page whose <link> points at css_file."""
+    return Template(Template(page).safe_substitute(stylesheet=_static_url(css_file)))
+
+
+# Page bodies are built once at import; handlers only substitute the few
+# per-request values. Styling lives in STATIC_DIR so browsers fetch it once.
+_UPLOAD_FORM_TMPL = _page_template("upload.css", """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Upload Photo - Sears Home Services</title>
-    <style>
-        * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }}
-        .container {{
-            background: white;
-            border-radius: 16px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            max-width: 500px;
-            width: 100%;
-            padding: 40px;
-        }}
-        .logo {{
-            text-align: center;
-            margin-bottom: 24px;
-        }}
-        .logo h1 {{
-            color: #1a1a2e;
-            font-size: 24px;
-            font-weight: 700;
-        }}
-        .logo span {{
-            color: #667eea;
-        }}
-        h2 {{
-            color: #333;
-            font-size: 20px;
-            margin-bottom: 16px;
-            text-align: center;
-        }}
-        .info {{
-            background: #f0f4ff;
-            border-left: 4px solid #667eea;
-            padding: 16px;
-            margin-bottom: 24px;
-            border-radius: 0 8px 8px 0;
-        }}
-        .info p {{
-            color: #4a5568;
-            font-size: 14px;
-            line-height: 1.6;
-        }}
-        .tips {{
-            margin-bottom: 24px;
-        }}
-        .tips h3 {{
-            color: #333;
-            font-size: 14px;
-            margin-bottom: 8px;
-        }}
-        .tips ul {{
-            list-style: none;
-            padding: 0;
-        }}
-        .tips li {{
-            color: #666;
-            font-size: 13px;
-            padding: 6px 0;
-            padding-left: 24px;
-            position: relative;
-        }}
-        .tips li::before {{
-            content: "✓";
-            color: #667eea;
-            position: absolute;
-            left: 0;
-        }}
-        form {{
-            display: flex;
-            flex-direction: column;
-            gap: 16px;
-        }}
-        .file-input {{
-            border: 2px dashed #ddd;
-            border-radius: 12px;
-            padding: 32px;
-            text-align: center;
-            cursor: pointer;
-            transition: all 0.3s;
-        }}
-        .file-input:hover {{
-            border-color: #667eea;
-            background: #f8f9ff;
-        }}
-        .file-input input {{
-            display: none;
-        }}
-        .file-input label {{
-            cursor: pointer;
-            color: #666;
-        }}
-        .file-input .icon {{
-            font-size: 48px;
-            margin-bottom: 8px;
-        }}
-        button {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            padding: 16px 32px;
-            font-size: 16px;
-            font-weight: 600;
-            border-radius: 8px;
-            cursor: pointer;
-            transition: transform 0.2s, box-shadow 0.2s;
-        }}
-        button:hover {{
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
-        }}
-        button:disabled {{
-            opacity: 0.6;
-            cursor: not-allowed;
-            transform: none;
-        }}
-        #fileName {{
-            color: #667eea;
-            font-weight: 500;
-            margin-top: 8px;
-        }}
-    </style>
+    <link rel="stylesheet" href="$stylesheet">
 </head>
 <body>
     <div class="container">
@@ -195,7 +71,7 @@ async def upload_form(token: str):
             <h1><span>Sears</span> Home Services</h1>
         </div>
         
-        <h2>Upload a Photo{appliance_text}</h2>
+        <h2>Upload a Photo$appliance_text</h2>
         
         <div class="info">
             <p>Upload a clear photo of your appliance to help us diagnose the issue. 
@@ -212,7 +88,7 @@ async def upload_form(token: str):
             </ul>
         </div>
         
-        <form action="/upload/{token}" method="post" enctype="multipart/form-data">
+        <form action="/upload/$token" method="post" enctype="multipart/form-data">
             <div class="file-input" onclick="document.getElementById('imageFile').click()">
                 <div class="icon">📷</div>
                 <label for="imageFile">Click or tap to select a photo</label>
@@ -227,239 +103,52 @@ async def upload_form(token: str):
 </html>
 """)
 
-
-@router.post("/upload/{token}", response_class=HTMLResponse)
-async def upload_image(token: str, image: UploadFile = File(...)):
-    """
-    POST /upload/{token}
-    Handle image upload, save file, run vision analysis.
-    """
-    upload_token = get_upload_token(token)
-    
-    if not upload_token:
-        return HTMLResponse(content=error_page("Invalid Link",
-            "This upload link is invalid."), status_code=404)
-    
-    if not is_token_valid(upload_token):
-        return HTMLResponse(content=error_page("Link Expired or Used",
-            "This upload link has expired or already been used."), status_code=410)
-    
-    if image.content_type not in ALLOWED_MIME_TYPES:
-        return HTMLResponse(content=error_page("Invalid File Type",
-            f"Please upload a JPEG, PNG, or WebP image. You uploaded: {image.content_type}"), status_code=400)
-    
-    ensure_upload_dir()
-    
-    ext = image.filename.split(".")[-1] if "." in image.filename else "jpg"
-    filename = f"{token}.{ext}"
-    file_path = UPLOAD_DIR / filename
-    
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        logger.info(f"Image saved: {file_path}")
-        
-        mark_token_used(token, str(file_path))
-        
-        analysis = analyze_image_with_gemini(
-            image_path=str(file_path),
-            appliance_type=upload_token.appliance_type,
-            symptom_summary=upload_token.symptom_summary
-        )
-        
-        # Check if it's actually an appliance image
-        is_appliance = analysis.get("is_appliance_image", True)
-        
-        update_token_analysis(
-            token=token,
-            analysis_summary=analysis.get("summary", ""),
-            troubleshooting_tips=analysis.get("troubleshooting", ""),
-            is_appliance_image=is_appliance
-        )
-        
-        # ISSUE 2.4: Show different page if not an appliance image
-        if not is_appliance:
-            return HTMLResponse(content=not_appliance_page(
-                appliance_type=upload_token.appliance_type,
-                summary=analysis.get("summary", "")
-            ))
-        
-        return HTMLResponse(content=success_page(
-            appliance_type=upload_token.appliance_type,
-            summary=analysis.get("summary", "No analysis available"),
-            troubleshooting=analysis.get("troubleshooting", "")
-        ))
-        
-    except Exception as e:
-        logger.error(f"Upload error: {e}")
-        return HTMLResponse(content=error_page("Upload Failed",
-            "There was an error processing your image. Please try again."), status_code=500)
-
-
-def error_page(title: str, message: str) -> str:
-    """Generate an error HTML page."""
-    return f"""
+_ERROR_PAGE_TMPL = _page_template("error.css", """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} - Sears Home Services</title>
-    <style>
-        * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }}
-        .container {{
-            background: white;
-            border-radius: 16px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            max-width: 500px;
-            width: 100%;
-            padding: 40px;
-            text-align: center;
-        }}
-        .icon {{ font-size: 64px; margin-bottom: 16px; }}
-        h1 {{ color: #e74c3c; font-size: 24px; margin-bottom: 16px; }}
-        p {{ color: #666; line-height: 1.6; }}
-        .contact {{
-            margin-top: 24px;
-            padding-top: 24px;
-            border-top: 1px solid #eee;
-            font-size: 14px;
-            color: #888;
-        }}
-    </style>
+    <title>$title - Sears Home Services</title>
+    <link rel="stylesheet" href="$stylesheet">
 </head>
 <body>
     <div class="container">
         <div class="icon">⚠️</div>
-        <h1>{title}</h1>
-        <p>{message}</p>
+        <h1>$title</h1>
+        <p>$message</p>
         <div class="contact">
             Need help? Call Sears Home Services
         </div>
     </div>
 </body>
 </html>
-"""
-
+""")
 
-def not_appliance_page(appliance_type: str, summary: str) -> str:
-    """
-    ISSUE 2.4: Generate a page for when uploaded image is NOT an appliance.
-    Prompts user to upload a correct image.
-    """
-    appliance_text = html_escape(appliance_type) if appliance_type else "appliance"
-    summary = html_escape(summary) if summary else ""
-    
-    return f"""
+_NOT_APPLIANCE_TMPL = _page_template("not_appliance.css", """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Please Upload Appliance Photo - Sears Home Services</title>
-    <style>
-        * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }}
-        .container {{
-            background: white;
-            border-radius: 16px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            max-width: 500px;
-            width: 100%;
-            padding: 40px;
-            text-align: center;
-        }}
-        .icon {{ font-size: 64px; margin-bottom: 16px; }}
-        h1 {{ color: #f5576c; font-size: 24px; margin-bottom: 16px; }}
-        p {{ color: #666; line-height: 1.6; margin-bottom: 16px; }}
-        .what-we-saw {{
-            background: #fff5f5;
-            border-radius: 8px;
-            padding: 16px;
-            margin: 20px 0;
-            text-align: left;
-        }}
-        .what-we-saw h3 {{
-            color: #f5576c;
-            font-size: 14px;
-            margin-bottom: 8px;
-        }}
-        .what-we-saw p {{
-            font-size: 14px;
-            color: #666;
-            margin: 0;
-        }}
-        .tips {{
-            background: #f0f4ff;
-            border-radius: 8px;
-            padding: 16px;
-            margin: 20px 0;
-            text-align: left;
-        }}
-        .tips h3 {{
-            color: #667eea;
-            font-size: 14px;
-            margin-bottom: 8px;
-        }}
-        .tips ul {{
-            list-style: none;
-            padding: 0;
-            margin: 0;
-        }}
-        .tips li {{
-            font-size: 13px;
-            color: #666;
-            padding: 4px 0;
-        }}
-        .tips li::before {{
-            content: "✓ ";
-            color: #667eea;
-        }}
-        .btn {{
-            display: inline-block;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            text-decoration: none;
-            padding: 14px 28px;
-            border-radius: 8px;
-            font-weight: 600;
-            margin-top: 16px;
-        }}
-    </style>
+    <link rel="stylesheet" href="$stylesheet">
 </head>
 <body>
     <div class="container">
         <div class="icon">📷</div>
-        <h1>Please Upload a Photo of Your {appliance_text.title()}</h1>
+        <h1>Please Upload a Photo of Your $appliance_title</h1>
         <p>The image you uploaded doesn't appear to show a home appliance.</p>
         
         <div class="what-we-saw">
             <h3>What we saw:</h3>
-            <p>{summary}</p>
+            <p>$summary</p>
         </div>
         
         <div class="tips">
             <h3>For best results, please upload a photo that shows:</h3>
             <ul>
-                <li>The {appliance_text} itself</li>
+                <li>The $appliance_text itself</li>
                 <li>Any error codes or warning lights on the display</li>
                 <li>Visible damage, leaks, or frost buildup</li>
                 <li>The model number label if possible</li>
@@ -471,134 +160,33 @@ def not_appliance_page(appliance_type: str, summary: str) -> str:
     </div>
 </body>
 </html>
-"""
-
+""")
 
-def success_page(appliance_type: str, summary: str, troubleshooting: str) -> str:
-    """Generate a success HTML page with analysis results."""
-    appliance_text = f" - {html_escape(appliance_type.title())}" if appliance_type else ""
-    summary = html_escape(summary) if summary else ""
-    troubleshooting = html_escape(troubleshooting) if troubleshooting else ""
-    
-    troubleshooting_html = ""
-    if troubleshooting:
-        steps = troubleshooting.split("\n")
-        troubleshooting_html = "<ul>"
-        for step in steps:
-            step = step.strip()
-            if step:
-                troubleshooting_html += f"<li>{step}</li>"
-        troubleshooting_html += "</ul>"
-    
-    return f"""
+_SUCCESS_PAGE_TMPL = _page_template("success.css", """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Analysis Complete - Sears Home Services</title>
-    <style>
-        * {{ box-sizing: border-box; margin: 0; padding: 0; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }}
-        .container {{
-            background: white;
-            border-radius: 16px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            max-width: 600px;
-            width: 100%;
-            padding: 40px;
-        }}
-        .header {{
-            text-align: center;
-            margin-bottom: 32px;
-        }}
-        .icon {{ font-size: 64px; margin-bottom: 16px; }}
-        h1 {{ color: #11998e; font-size: 24px; margin-bottom: 8px; }}
-        .subtitle {{ color: #888; font-size: 14px; }}
-        .section {{
-            margin-bottom: 24px;
-        }}
-        .section h2 {{
-            color: #333;
-            font-size: 16px;
-            margin-bottom: 12px;
-            padding-bottom: 8px;
-            border-bottom: 2px solid #11998e;
-        }}
-        .analysis {{
-            background: #f0fff4;
-            border-radius: 8px;
-            padding: 16px;
-            color: #2d3748;
-            line-height: 1.6;
-        }}
-        .troubleshooting ul {{
-            list-style: none;
-            padding: 0;
-        }}
-        .troubleshooting li {{
-            background: #f8f9fa;
-            margin-bottom: 8px;
-            padding: 12px 16px;
-            border-radius: 8px;
-            color: #4a5568;
-            position: relative;
-            padding-left: 40px;
-        }}
-        .troubleshooting li::before {{
-            content: "→";
-            color: #11998e;
-            font-weight: bold;
-            position: absolute;
-            left: 16px;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 32px;
-            padding-top: 24px;
-            border-top: 1px solid #eee;
-        }}
-        .footer p {{
-            color: #888;
-            font-size: 14px;
-            margin-bottom: 8px;
-        }}
-        .btn {{
-            display: inline-block;
-            background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-            color: white;
-            text-decoration: none;
-            padding: 12px 24px;
-            border-radius: 8px;
-            font-weight: 600;
-            margin-top: 8px;
-        }}
-    </style>
+    <link rel="stylesheet" href="$stylesheet">
 </head>
 <body>
     <div class="container">
         <div class="header">
             <div class="icon">✅</div>
-            <h1>Analysis Complete{appliance_text}</h1>
+            <h1>Analysis Complete$appliance_text</h1>
             <p class="subtitle">Our AI has analyzed your image</p>
         </div>
         
         <div class="section">
             <h2>🔍 What We Found</h2>
-            <div class="analysis">{summary}</div>
+            <div class="analysis">$summary</div>
         </div>
         
         <div class="section troubleshooting">
             <h2>🔧 Suggested Troubleshooting Steps</h2>
-            {troubleshooting_html if troubleshooting_html else '<p style="color: #666;">No specific steps identified. A technician visit may be needed.</p>'}
+            $troubleshooting_html
         </div>
         
         <div class="footer">
@@ -608,4 +196,379 @@ def success_page(appliance_type: str, summary: str, troubleshooting: str) -> str
     </div>
 </body>
 </html>
-"""
+""")
+
+_NO_TROUBLESHOOTING_HTML = (
+    '<p style="color: #666;">No specific steps identified. A technician visit may be needed.</p>'
+)
+
+_PROCESSING_PAGE_TMPL = _page_template("processing.css", """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Analyzing Photo - Sears Home Services</title>
+    <link rel="stylesheet" href="$stylesheet">
+</head>
+<body>
+    <div class="container">
+        <div class="icon">🔍</div>
+        <h1>Analyzing Your Photo</h1>
+        <p id="message">Our AI is looking at your image. This usually takes a few seconds.</p>
+    </div>
+    <script>
+        let attempts = 0;
+        async function poll() {
+            attempts += 1;
+            try {
+                const res = await fetch("/upload/$token/status");
+                const data = await res.json();
+                if (data.status === "done") {
+                    window.location.replace("/upload/$token/result");
+                    return;
+                }
+            } catch (e) {}
+            if (attempts < 120) {
+                setTimeout(poll, 1000);
+            } else {
+                document.getElementById("message").textContent =
+                    "This is taking longer than expected. Please refresh the page in a moment.";
+            }
+        }
+        setTimeout(poll, 1000);
+    </script>
+</body>
+</html>
+""")
+
+
+_ready_upload_dirs: set[Path] = set()
+
+
+def ensure_upload_dir() -> None:
+    """Create UPLOAD_DIR; called once while the app is assembled, not per upload."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def upload_path(token: str, ext: str) -> Path:
+    """
+    Sharded location for an upload: uploads/<ab>/<cd>/<token>.<ext>, using the
+    first four hex chars of the token so no single directory grows unbounded.
+    Files saved before sharding stay where they are; image_url records the path.
+    """
+    directory = UPLOAD_DIR / token[:2] / token[2:4]
+    if directory not in _ready_upload_dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+        _ready_upload_dirs.add(directory)
+    return directory / f"{token}.{ext}"
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Identify an allowed image format from its first bytes.
+    Returns the file extension to store it under, or None.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+@router.get("/upload/{token}", response_class=HTMLResponse)
+async def upload_form(token: str):
+    """
+    GET /upload/{token}
+    Display the image upload form if token is valid.
+    """
+    upload_token = get_upload_token(token)
+    
+    if not upload_token:
+        return _error_response("Invalid Link",
+            "This upload link is invalid or does not exist.", status_code=404)
+    
+    if not is_token_valid(upload_token):
+        if upload_token.used_at:
+            return _error_response("Already Used",
+                "This upload link has already been used. Check your email for the analysis results.", status_code=410)
+        else:
+            return _error_response("Link Expired",
+                "This upload link has expired. Please call us again to get a new link.", status_code=410)
+    
+    appliance_text = f" for your {html_escape(upload_token.appliance_type)}" if upload_token.appliance_type else ""
+    
+    return HTMLResponse(content=_UPLOAD_FORM_TMPL.substitute(
+        token=token, appliance_text=appliance_text))
+
+
+@router.post("/upload/{token}", response_class=HTMLResponse)
+async def upload_image(token: str, request: Request, background: BackgroundTasks,
+                       image: UploadFile = File(...)):
+    """
+    POST /upload/{token}
+    Handle image upload and save the file. Vision analysis runs as a
+    background task; the browser gets a processing page that polls
+    /upload/{token}/status.
+    """
+    upload_token = get_upload_token(token)
+    
+    if not upload_token:
+        return _error_response("Invalid Link",
+            "This upload link is invalid.", status_code=404)
+    
+    if not is_token_valid(upload_token):
+        return _error_response("Link Expired or Used",
+            "This upload link has expired or already been used.", status_code=410)
+    
+    if image.content_type not in ALLOWED_MIME_TYPES:
+        return HTMLResponse(content=error_page("Invalid File Type",
+            f"Please upload a JPEG, PNG, or WebP image. You uploaded: {html_escape(image.content_type or '')}"),
+            status_code=400)
+    
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        return _error_response("File Too Large",
+            "Please upload an image smaller than 10 MB.", status_code=413)
+    
+    # Trust the file's magic bytes, not the browser-supplied MIME type or name
+    head = await image.read(16)
+    ext = sniff_image_type(head)
+    if ext is None:
+        return _error_response("Invalid File Type",
+            "Please upload a JPEG, PNG, or WebP image.", status_code=400)
+    
+    file_path = upload_path(token, ext)
+    
+    try:
+        spool_fd = _rolled_spool_fileno(image.file)
+        if spool_fd is not None:
+            # Large uploads are already in a temp file: let the kernel copy it
+            written = await asyncio.to_thread(_sendfile_to_path, spool_fd, file_path)
+        else:
+            written = await _stream_to_path(image, head, file_path)
+        if written > MAX_UPLOAD_BYTES:
+            # Content-Length was absent or understated
+            file_path.unlink(missing_ok=True)
+            return _error_response("File Too Large",
+                "Please upload an image smaller than 10 MB.", status_code=413)
+        
+        logger.info(f"Image saved: {file_path}")
+        
+        mark_token_used(token, str(file_path))
+    except Exception as e:
+        logger.error(f"Upload error: {e}")
+        return _error_response("Upload Failed",
+            "There was an error processing your image. Please try again.", status_code=500)
+    
+    background.add_task(
+        _run_vision_and_store,
+        token,
+        str(file_path),
+        upload_token.call_sid,
+        upload_token.appliance_type,
+        upload_token.symptom_summary,
+    )
+    return HTMLResponse(content=processing_page(token))
+
+
+def _rolled_spool_fileno(spool) -> Optional[int]:
+    """
+    File descriptor of an upload spool that has rolled over to a real temp
+    file, or None while it is still in memory (fileno() would force a rollover)
+    or when the platform has no os.sendfile.
+    """
+    if not hasattr(os, "sendfile") or not getattr(spool, "_rolled", False):
+        return None
+    try:
+        return spool.fileno()
+    except (OSError, ValueError):
+        return None
+
+
+def _sendfile_to_path(src_fd: int, file_path: Path) -> int:
+    """
+    Copy a whole on-disk upload spool to file_path with os.sendfile.
+    Returns the source size; nothing is written when it exceeds MAX_UPLOAD_BYTES.
+    """
+    size = os.fstat(src_fd).st_size
+    if size > MAX_UPLOAD_BYTES:
+        return size
+    with open(file_path, "wb") as out:
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(out.fileno(), src_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    return size
+
+
+async def _stream_to_path(image: UploadFile, head: bytes, file_path: Path) -> int:
+    """
+    Write an in-memory upload to file_path in chunks, after the already-read
+    head. Stops once MAX_UPLOAD_BYTES is exceeded and returns the bytes seen.
+    """
+    written = len(head)
+    async with aiofiles.open(file_path, "wb") as buffer:
+        await buffer.write(head)
+        while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > MAX_UPLOAD_BYTES:
+                break
+            await buffer.write(chunk)
+    return written
+
+
+async def _run_vision_and_store(token: str, image_path: str, call_sid: str,
+                                appliance_type: str, symptom_summary: str):
+    """
+    Run Gemini vision on a saved upload, store the result and wake the voice turn.
+    Any failure stores the fallback analysis instead, and the call is always
+    notified, so neither the processing page nor the call waits out a timeout.
+    """
+    try:
+        try:
+            async with _vision_semaphore:
+                analysis = await analyze_image_with_gemini_async(
+                    image_path=image_path,
+                    appliance_type=appliance_type,
+                    symptom_summary=symptom_summary
+                )
+        except Exception as e:
+            logger.error(f"Vision analysis failed for token {token}: {e}")
+            analysis = fallback_analysis(appliance_type, symptom_summary)
+        
+        try:
+            await _store_analysis(token, analysis)
+        except Exception as e:
+            logger.error(f"Storing vision analysis failed for token {token}: {e}")
+            await _store_analysis(token, fallback_analysis(appliance_type, symptom_summary))
+    except Exception as e:
+        logger.error(f"Storing fallback analysis failed for token {token}: {e}")
+    finally:
+        notify_upload_complete(call_sid)
+
+
+async def _store_analysis(token: str, analysis: dict):
+    """Persist a vision result off the event loop (update_token_analysis is a blocking DB write)."""
+    await asyncio.to_thread(
+        update_token_analysis,
+        token=token,
+        analysis_summary=analysis.get("summary", ""),
+        troubleshooting_tips=analysis.get("troubleshooting", ""),
+        is_appliance_image=analysis.get("is_appliance_image", True)
+    )
+
+
+@router.get("/upload/{token}/status")
+async def upload_status(token: str):
+    """
+    GET /upload/{token}/status
+    Polled by the processing page until the background analysis is stored.
+    """
+    upload_token = get_upload_token(token)
+    if not upload_token:
+        return JSONResponse({"status": "not_found"}, status_code=404)
+    
+    if upload_token.analysis_summary is None:
+        return {"status": "processing"}
+    
+    return {
+        "status": "done",
+        "summary": upload_token.analysis_summary,
+        "troubleshooting": upload_token.troubleshooting_tips,
+        "is_appliance": upload_token.is_appliance_image is not False,
+    }
+
+
+@router.get("/upload/{token}/result", response_class=HTMLResponse)
+async def upload_result(token: str):
+    """
+    GET /upload/{token}/result
+    Show the stored analysis once the background task has finished.
+    """
+    upload_token = get_upload_token(token)
+    if not upload_token:
+        return _error_response("Invalid Link",
+            "This upload link is invalid.", status_code=404)
+    
+    if upload_token.analysis_summary is None:
+        return HTMLResponse(content=processing_page(token))
+    
+    # ISSUE 2.4: Show different page if not an appliance image
+    if upload_token.is_appliance_image is False:
+        return HTMLResponse(content=not_appliance_page(
+            appliance_type=upload_token.appliance_type,
+            summary=upload_token.analysis_summary
+        ))
+    
+    return HTMLResponse(content=success_page(
+        appliance_type=upload_token.appliance_type,
+        summary=upload_token.analysis_summary or "No analysis available",
+        troubleshooting_html=build_troubleshooting_html(upload_token.troubleshooting_tips or "")
+    ))
+
+
+def processing_page(token: str) -> str:
+    """Generate the page shown while the image is being analyzed."""
+    return _PROCESSING_PAGE_TMPL.substitute(token=quote(token, safe=""))
+
+
+@lru_cache(maxsize=16)
+def _static_error_page(title: str, message: str) -> bytes:
+    """Encoded error page for the fixed (title, message) pairs; rendered once each."""
+    return error_page(title, message).encode("utf-8")
+
+
+def _error_response(title: str, message: str, status_code: int) -> Response:
+    """Serve a fixed error page from its pre-encoded bytes, with no per-request rendering or encoding."""
+    return Response(content=_static_error_page(title, message),
+                    media_type="text/html", status_code=status_code)
+
+
+def error_page(title: str, message: str) -> str:
+    """Generate an error HTML page."""
+    return _ERROR_PAGE_TMPL.substitute(title=title, message=message)
+
+
+def not_appliance_page(appliance_type: str, summary: str) -> str:
+    """
+    ISSUE 2.4: Generate a page for when uploaded image is NOT an appliance.
+    Prompts user to upload a correct image.
+    """
+    appliance_text = html_escape(appliance_type) if appliance_type else "appliance"
+    summary = html_escape(summary) if summary else ""
+    
+    return _NOT_APPLIANCE_TMPL.substitute(
+        appliance_text=appliance_text,
+        appliance_title=appliance_text.title(),
+        summary=summary,
+    )
+
+
+@lru_cache(maxsize=256)
+def build_troubleshooting_html(troubleshooting: str) -> str:
+    """
+    Render newline-separated troubleshooting steps as an escaped <ul>.
+    Cached on the tips text, so refreshes of a result page (and repeated
+    fallback tips) split and escape the steps only once.
+    """
+    steps = [html_escape(step.strip()) for step in troubleshooting.split("\n") if step.strip()]
+    if not steps:
+        return _NO_TROUBLESHOOTING_HTML
+    return "<ul>" + "".join(f"<li>{step}</li>" for step in steps) + "</ul>"
+
+
+def success_page(appliance_type: str, summary: str, troubleshooting_html: str) -> str:
+    """Generate a success HTML page around a prebuilt troubleshooting fragment."""
+    appliance_text = f" - {html_escape(appliance_type.title())}" if appliance_type else ""
+    summary = html_escape(summary) if summary else ""
+    
+    return _SUCCESS_PAGE_TMPL.substitute(
+        appliance_text=appliance_text,
+        summary=summary,
+        troubleshooting_html=troubleshooting_html,
+    )
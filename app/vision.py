@@ -4,66 +4,144 @@ Analyze appliance images using Gemini multimodal model.
 
 ISSUE 2: Enhanced to detect if image actually shows an appliance.
 """
+import asyncio
+import hashlib
+import importlib.util
+import io
 import os
-import base64
 import json
-from typing import Optional, Dict, Any
+import re
+import threading
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Tuple
 from pathlib import Path
 
-import google.generativeai as genai
+try:
+    # Only checks that the SDK is installed; it is imported on first use in
+    # _get_model, so processes without a key never load it
+    _HAS_GENAI = importlib.util.find_spec("google.generativeai") is not None
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # SDK not installed: every analysis uses the fallback
+    _HAS_GENAI = False
+    google_exceptions = None
+genai = None
 
-from .config import GEMINI_API_KEY, GEMINI_MODEL
+from .config import (
+    GEMINI_API_KEY, GEMINI_MODEL, GEMINI_DOWNSCALE, VISION_MAX_EDGE,
+)
+from .ttl_cache import TTLCache
 from .logging_config import get_logger
 
 logger = get_logger("vision")
 
+# Configured once per process and shared by every analysis; GenerativeModel is
+# safe to call from the worker threads the upload route dispatches to.
+_model = None
+_model_lock = threading.Lock()
 
-def analyze_image_with_gemini(
+# 429 / 5xx from the Gemini API: worth another try after a pause
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+) if _HAS_GENAI else ()
+VISION_MAX_RETRIES = 3
+VISION_RETRY_BASE_DELAY = 0.5  # seconds; doubles per attempt
+
+# JSON mode: the model returns bare JSON in this shape, no fences or prose
+_VISION_GENERATION_CONFIG = MappingProxyType({
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "is_appliance_image": {"type": "boolean"},
+            "summary": {"type": "string"},
+            "troubleshooting": {"type": "string"},
+        },
+        "required": ["summary", "troubleshooting"],
+    },
+})
+
+# Customers often send the same photo twice (retries, re-uploads); only real
+# Gemini answers are cached, never fallbacks.
+_vision_cache = TTLCache(max_entries=512, ttl_seconds=3600)
+
+
+def _get_model():
+    """Return the shared vision GenerativeModel, importing and configuring the SDK on first use."""
+    global _model, genai
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if genai is None:
+                    import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY)
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+
+async def warmup_vision() -> None:
+    """
+    Open the async Gemini channel before the first customer upload. Uploads
+    go through generate_content_async, so a (free) count_tokens_async call
+    pays the TLS handshake on that same channel. Failures are only logged.
+    """
+    if not _HAS_GENAI or not GEMINI_API_KEY:
+        return
+    try:
+        await _get_model().count_tokens_async("warmup")
+        logger.info("Vision model connection warmed up")
+    except Exception as e:
+        logger.warning("Vision warmup failed: %s", e)
+
+
+def _load_image_and_key(
     image_path: str,
-    appliance_type: Optional[str] = None,
-    symptom_summary: Optional[str] = None
-) -> Dict[str, Any]:
+    appliance_type: Optional[str],
+    symptom_summary: Optional[str]
+) -> Optional[Tuple[bytes, str]]:
     """
-    Analyze an appliance image using Gemini Vision.
+    Read the upload and derive its analysis cache key from the image content
+    and call context, so a re-uploaded photo maps to the same entry whatever
+    its token or filename. None if the image can't be read.
+    """
+    image_data = load_image_bytes(image_path)
+    if not image_data:
+        logger.error("Failed to load image: %s", image_path)
+        return None
+    digest = hashlib.blake2b(image_data, digest_size=16).hexdigest()
+    return image_data, f"{digest}|{appliance_type or ''}|{symptom_summary or ''}"
+
+
+def _build_vision_request(
+    image_path: str,
+    image_data: bytes,
+    appliance_type: Optional[str],
+    symptom_summary: Optional[str]
+) -> list:
+    """Prompt + inline image parts for generate_content."""
+    mime_type = get_mime_type(image_path)
+    if GEMINI_DOWNSCALE:
+        try:
+            downscaled = _downscale_image(image_data)
+        except Exception as e:
+            logger.warning("Downscale failed, sending original image: %s", e)
+            downscaled = None
+        if downscaled is not None:
+            logger.debug("Downscaled %s: %d -> %d bytes", image_path, len(image_data), len(downscaled))
+            image_data, mime_type = downscaled, "image/jpeg"
     
-    Args:
-        image_path: Path to the image file
-        appliance_type: Type of appliance (from call context)
-        symptom_summary: Summary of reported symptoms (from call context)
+    context_parts = []
+    if appliance_type:
+        context_parts.append(f"Appliance type: {appliance_type}")
+    if symptom_summary:
+        context_parts.append(f"Reported symptoms: {symptom_summary}")
     
-    Returns:
-        {
-            "summary": "Description of what was found in the image",
-            "troubleshooting": "Step-by-step troubleshooting suggestions",
-            "is_appliance_image": True/False - whether image shows the expected appliance
-        }
-    """
-    if not GEMINI_API_KEY:
-        logger.warning("No GEMINI_API_KEY set, using fallback response")
-        return fallback_analysis(appliance_type, symptom_summary)
+    context = "\n".join(context_parts) if context_parts else "No additional context provided."
     
-    try:
-        import google.generativeai as genai
-        
-        genai.configure(api_key=GEMINI_API_KEY)
-        
-        image_data = load_image_as_base64(image_path)
-        if not image_data:
-            logger.error(f"Failed to load image: {image_path}")
-            return fallback_analysis(appliance_type, symptom_summary)
-        
-        mime_type = get_mime_type(image_path)
-        
-        context_parts = []
-        if appliance_type:
-            context_parts.append(f"Appliance type: {appliance_type}")
-        if symptom_summary:
-            context_parts.append(f"Reported symptoms: {symptom_summary}")
-        
-        context = "\n".join(context_parts) if context_parts else "No additional context provided."
-        
-        # ISSUE 2: Updated prompt to detect if image actually shows an appliance
-        prompt = f"""You are an expert appliance repair technician analyzing an image sent by a customer.
+    # ISSUE 2: Updated prompt to detect if image actually shows an appliance
+    prompt = f"""You are an expert appliance repair technician analyzing an image sent by a customer.
 
 Context from the customer's call:
 {context}
@@ -94,50 +172,182 @@ Format your response as JSON:
 
 Be strict about is_appliance_image - only set to true if you can clearly see a home appliance in the image."""
 
-        model = genai.GenerativeModel(GEMINI_MODEL)
+    return [
+        prompt,
+        {
+            "mime_type": mime_type,
+            "data": image_data
+        }
+    ]
+
+
+def analyze_image_with_gemini(
+    image_path: str,
+    appliance_type: Optional[str] = None,
+    symptom_summary: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Analyze an appliance image using Gemini Vision.
+    
+    Args:
+        image_path: Path to the image file
+        appliance_type: Type of appliance (from call context)
+        symptom_summary: Summary of reported symptoms (from call context)
+    
+    Returns:
+        {
+            "summary": "Description of what was found in the image",
+            "troubleshooting": "Step-by-step troubleshooting suggestions",
+            "is_appliance_image": True/False - whether image shows the expected appliance
+        }
+    """
+    if not _HAS_GENAI or not GEMINI_API_KEY:
+        logger.warning("Gemini SDK or GEMINI_API_KEY unavailable, using fallback response")
+        return fallback_analysis(appliance_type, symptom_summary)
+    
+    if not image_path:
+        return fallback_analysis(appliance_type, symptom_summary)
+    
+    try:
+        # Missing and 0-byte files fall back here, before the SDK is touched
+        loaded = _load_image_and_key(image_path, appliance_type, symptom_summary)
+        if loaded is None:
+            return fallback_analysis(appliance_type, symptom_summary)
+        image_data, cache_key = loaded
+        cached = _vision_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Vision cache hit: %s", image_path)
+            return dict(cached)
         
-        response = model.generate_content([
-            prompt,
-            {
-                "mime_type": mime_type,
-                "data": image_data
-            }
-        ])
+        model = _get_model()
+        parts = _build_vision_request(image_path, image_data, appliance_type, symptom_summary)
+        response = model.generate_content(parts, generation_config=dict(_VISION_GENERATION_CONFIG))
         
         result_text = response.text.strip()
-        logger.debug(f"Raw response: {result_text[:200]}...")
+        logger.debug("Raw response: %.200s...", result_text)
         
-        return parse_vision_response(result_text, appliance_type, symptom_summary)
+        result = parse_vision_response(result_text, appliance_type, symptom_summary)
+        _vision_cache.put(cache_key, dict(result))
+        return result
         
     except Exception as e:
-        logger.error(f"Error during analysis: {e}")
+        logger.error("Error during analysis: %s", e)
         return fallback_analysis(appliance_type, symptom_summary)
 
 
-def load_image_as_base64(image_path: str) -> Optional[str]:
-    """Load an image file and return as base64 string."""
+async def analyze_image_with_gemini_async(
+    image_path: str,
+    appliance_type: Optional[str] = None,
+    symptom_summary: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Async variant of analyze_image_with_gemini for use on the event loop.
+    Rate-limit and server errors are retried with exponential backoff
+    before falling back.
+    """
+    if not _HAS_GENAI or not GEMINI_API_KEY:
+        logger.warning("Gemini SDK or GEMINI_API_KEY unavailable, using fallback response")
+        return fallback_analysis(appliance_type, symptom_summary)
+    
+    if not image_path:
+        return fallback_analysis(appliance_type, symptom_summary)
+    
     try:
-        path = Path(image_path)
-        if not path.exists():
-            return None
+        # Missing and 0-byte files fall back here, before the SDK is touched
+        loaded = await asyncio.to_thread(_load_image_and_key, image_path, appliance_type, symptom_summary)
+        if loaded is None:
+            return fallback_analysis(appliance_type, symptom_summary)
+        image_data, cache_key = loaded
+        cached = _vision_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Vision cache hit: %s", image_path)
+            return dict(cached)
         
-        with open(path, "rb") as f:
-            return base64.standard_b64encode(f.read()).decode("utf-8")
+        model = _get_model()
+        parts = await asyncio.to_thread(
+            _build_vision_request, image_path, image_data, appliance_type, symptom_summary
+        )
+        for attempt in range(VISION_MAX_RETRIES + 1):
+            try:
+                response = await model.generate_content_async(
+                    parts, generation_config=dict(_VISION_GENERATION_CONFIG)
+                )
+                break
+            except _RETRYABLE_ERRORS as e:
+                if attempt == VISION_MAX_RETRIES:
+                    raise
+                delay = VISION_RETRY_BASE_DELAY * (2 ** attempt)
+                logger.warning("Vision call failed (%s); retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+        
+        result_text = response.text.strip()
+        logger.debug("Raw response: %.200s...", result_text)
+        
+        result = parse_vision_response(result_text, appliance_type, symptom_summary)
+        _vision_cache.put(cache_key, dict(result))
+        return result
+        
+    except Exception as e:
+        logger.error("Error during analysis: %s", e)
+        return fallback_analysis(appliance_type, symptom_summary)
+
+
+def _downscale_image(image_data: bytes) -> Optional[bytes]:
+    """
+    Re-encode an image as JPEG (quality 80) no larger than VISION_MAX_EDGE on
+    its longer side. Returns None when the image already fits, so small
+    uploads go out untouched.
+    """
+    # Imported only when GEMINI_DOWNSCALE is on
+    from PIL import Image, ImageOps
+    
+    with Image.open(io.BytesIO(image_data)) as im:
+        if max(im.size) <= VISION_MAX_EDGE:
+            return None
+        # Lets the JPEG decoder skip straight to a reduced scale
+        im.draft("RGB", (VISION_MAX_EDGE, VISION_MAX_EDGE))
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.convert("RGB").save(buf, format="JPEG", quality=80, optimize=True)
+        return buf.getvalue()
+
+
+def clear_vision_cache():
+    """Drop all cached vision analyses."""
+    _vision_cache.clear()
+
+
+def load_image_bytes(image_path: str) -> Optional[bytes]:
+    """
+    Load an image file as raw bytes. The SDK takes bytes for inline image
+    parts and encodes them once on the wire, so no base64 copy is made here.
+    """
+    try:
+        # read_bytes goes through unbuffered FileIO sized from one fstat;
+        # a missing file surfaces here instead of via a separate exists() stat
+        return Path(image_path).read_bytes()
+    except FileNotFoundError:
+        return None
     except Exception as e:
-        logger.error(f"Error loading image: {e}")
+        logger.error("Error loading image: %s", e)
         return None
 
 
+# Leading ```/```json and trailing ``` fences around a JSON reply, stripped in one pass
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+_MIME_BY_EXT = MappingProxyType({
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp"
+})
+
+
 def get_mime_type(image_path: str) -> str:
     """Determine MIME type from file extension."""
-    ext = Path(image_path).suffix.lower()
-    mime_map = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".webp": "image/webp"
-    }
-    return mime_map.get(ext, "image/jpeg")
+    return _MIME_BY_EXT.get(os.path.splitext(image_path)[1].lower(), "image/jpeg")
 
 
 def parse_vision_response(
@@ -147,19 +357,13 @@ def parse_vision_response(
 ) -> Dict[str, Any]:
     """Parse the Gemini response, handling JSON or plain text.
     
+    Requests run in JSON mode, so the fence and plain-text handling only
+    matter for replies that ignore it.
+    
     ISSUE 2: Now includes is_appliance_image field.
     """
     try:
-        cleaned = response_text.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]
-        if cleaned.startswith("```"):
-            cleaned = cleaned[3:]
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-        cleaned = cleaned.strip()
-        
-        result = json.loads(cleaned)
+        result = json.loads(_FENCE_RE.sub("", response_text))
         
         # ISSUE 2: Extract is_appliance_image, default to True if not present
         is_appliance = result.get("is_appliance_image", True)
@@ -1,49 +1,31 @@
 """Tests for app.config module."""
 import os
+from types import SimpleNamespace
+
 import pytest
-from unittest.mock import MagicMock
+
+from app.config import APP_BASE_URL, STT_SPEECH_MODEL, TTS_VOICE, get_base_url_from_request
 
 
 def test_tts_voice_default():
     """TTS_VOICE should default to a Google WaveNet or Polly Neural voice."""
-    from app.config import TTS_VOICE
     assert "Wavenet" in TTS_VOICE or "Neural" in TTS_VOICE or TTS_VOICE == os.getenv("TTS_VOICE", "Google.en-US-Wavenet-F")
 
 
 def test_stt_speech_model():
     """STT_SPEECH_MODEL should be 'phone_call'."""
-    from app.config import STT_SPEECH_MODEL
     assert STT_SPEECH_MODEL == "phone_call"
 
 
-def test_get_base_url_from_request_with_host():
-    """get_base_url_from_request should derive URL from Host header."""
-    from app.config import get_base_url_from_request
-
-    mock_request = MagicMock()
-    mock_request.headers = {
-        "host": "abc123.ngrok-free.app",
-        "x-forwarded-proto": "https",
-    }
-    result = get_base_url_from_request(mock_request)
-    assert result == "https://abc123.ngrok-free.app"
-
-
-def test_get_base_url_from_request_no_forwarded_proto():
-    """Should default to https when x-forwarded-proto is missing."""
-    from app.config import get_base_url_from_request
-
-    mock_request = MagicMock()
-    mock_request.headers = {"host": "example.com"}
-    result = get_base_url_from_request(mock_request)
-    assert result == "https://example.com"
-
-
-def test_get_base_url_from_request_no_host():
-    """Should fall back to APP_BASE_URL when Host header is missing."""
-    from app.config import get_base_url_from_request, APP_BASE_URL
-
-    mock_request = MagicMock()
-    mock_request.headers = {}
-    result = get_base_url_from_request(mock_request)
-    assert result == APP_BASE_URL
+@pytest.mark.parametrize("headers,expected", [
+    # Derive the URL from the Host header and forwarded proto
+    ({"host": "abc123.ngrok-free.app", "x-forwarded-proto": "https"}, "https://abc123.ngrok-free.app"),
+    # Default to https when x-forwarded-proto is missing
+    ({"host": "example.com"}, "https://example.com"),
+    # Fall back to APP_BASE_URL when the Host header is missing
+    ({}, APP_BASE_URL),
+], ids=["with_host", "no_forwarded_proto", "no_host"])
+def test_get_base_url_from_request(headers, expected):
+    """get_base_url_from_request should prefer the request's Host header."""
+    request = SimpleNamespace(headers=headers)
+    assert get_base_url_from_request(request) == expected
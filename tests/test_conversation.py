@@ -12,34 +12,52 @@ from datetime import datetime
 
 # ── Initial State ──────────────────────────────────────────────────────
 
+REQUIRED_STATE_KEYS = frozenset({
+    "step", "appliance_type", "symptoms", "symptom_summary",
+    "error_codes", "is_urgent", "troubleshooting_step", "resolved",
+    "zip_code", "time_preference", "offered_slots", "customer_phone",
+    "appointment_booked", "appointment_id", "no_input_attempts",
+    "customer_email", "pending_email", "email_attempts",
+    "email_confirm_attempts", "image_upload_sent", "upload_token",
+    "waiting_for_upload", "upload_poll_count",
+    "understand_attempts", "appliance_attempts", "zip_attempts",
+    "customer_name", "troubleshooting_steps_text", "analysis_spoken",
+    "upload_wait_attempts",
+})
+
+
+# Read-only baselines shared by the tests below; tests that mutate a state
+# build their own with _get_initial_state().
+@pytest.fixture(scope="session")
+def initial_state():
+    return _get_initial_state()
+
+
+@pytest.fixture(scope="session")
+def serialized_initial(initial_state):
+    return _serialize_state(initial_state)
+
+
 class TestInitialState:
-    def test_initial_state_has_required_keys(self):
-        state = _get_initial_state()
-        required = [
-            "step", "appliance_type", "symptoms", "symptom_summary",
-            "error_codes", "is_urgent", "troubleshooting_step", "resolved",
-            "zip_code", "time_preference", "offered_slots", "customer_phone",
-            "appointment_booked", "appointment_id", "no_input_attempts",
-            "customer_email", "pending_email", "email_attempts",
-            "email_confirm_attempts", "image_upload_sent", "upload_token",
-            "waiting_for_upload", "upload_poll_count",
-            "understand_attempts", "appliance_attempts", "zip_attempts",
-            "customer_name", "troubleshooting_steps_text", "analysis_spoken",
-            "upload_wait_attempts",
-        ]
-        for key in required:
-            assert key in state, f"Missing key: {key}"
+    def test_initial_state_has_required_keys(self, initial_state):
+        missing = REQUIRED_STATE_KEYS - initial_state.keys()
+        assert not missing, f"Missing keys: {sorted(missing)}"
+
+    def test_initial_states_do_not_share_lists(self):
+        first = _get_initial_state()
+        first["error_codes"].append("E21")
+        first["offered_slot_ids"].append(7)
+        second = _get_initial_state()
+        assert second["error_codes"] == [] and second["offered_slot_ids"] == []
 
-    def test_initial_step_is_greet_ask_name(self):
-        state = _get_initial_state()
-        assert state["step"] == "greet_ask_name"
+    def test_initial_step_is_greet_ask_name(self, initial_state):
+        assert initial_state["step"] == "greet_ask_name"
 
-    def test_initial_state_counters_are_zero(self):
-        state = _get_initial_state()
-        assert state["no_input_attempts"] == 0
-        assert state["email_attempts"] == 0
-        assert state["understand_attempts"] == 0
-        assert state["zip_attempts"] == 0
+    def test_initial_state_counters_are_zero(self, initial_state):
+        assert initial_state["no_input_attempts"] == 0
+        assert initial_state["email_attempts"] == 0
+        assert initial_state["understand_attempts"] == 0
+        assert initial_state["zip_attempts"] == 0
 
 
 # ── Serialization / Deserialization ────────────────────────────────────
@@ -69,38 +87,111 @@ class TestSerialization:
         result = _deserialize_state(state)
         assert isinstance(result["offered_slots"][0]["start_time"], datetime)
 
-    def test_roundtrip(self):
-        original = _get_initial_state()
-        serialized = _serialize_state(original)
-        deserialized = _deserialize_state(serialized)
-        assert deserialized["step"] == original["step"]
-        assert deserialized["no_input_attempts"] == original["no_input_attempts"]
+    def test_serialize_leaves_input_untouched(self):
+        slot = {"slot_id": 1, "start_time": datetime(2025, 6, 15, 9, 0)}
+        state = {"offered_slots": [slot], "offered_slot_ids": [1], "step": "choose_slot"}
+        result = _serialize_state(state)
+        assert isinstance(slot["start_time"], datetime)
+        assert result["offered_slot_ids"] == [1] and result["step"] == "choose_slot"
+
+    def test_deserialize_only_known_datetime_fields(self):
+        state = {
+            "start_time": "2025-06-15T09:00:00Z",
+            "end_time": "not a date",
+            "zip_code": "2025-06-15",
+        }
+        result = _deserialize_state(state)
+        assert result["start_time"].utcoffset().total_seconds() == 0
+        assert result["end_time"] == "not a date"
+        assert result["zip_code"] == "2025-06-15"
+
+    def test_roundtrip(self, initial_state, serialized_initial):
+        deserialized = _deserialize_state(serialized_initial)
+        assert deserialized["step"] == initial_state["step"]
+        assert deserialized["no_input_attempts"] == initial_state["no_input_attempts"]
+
+    def test_db_roundtrip_keeps_slot_datetimes(self):
+        from app.conversation import get_state, update_state
+        state = get_state("CA-serialize-roundtrip")
+        state["offered_slots"] = [
+            {"slot_id": 1, "start_time": datetime(2025, 6, 15, 9, 0), "end_time": datetime(2025, 6, 15, 12, 0)}
+        ]
+        update_state("CA-serialize-roundtrip", state)
+
+        reloaded = get_state("CA-serialize-roundtrip")
+        assert reloaded["offered_slots"][0]["start_time"] == datetime(2025, 6, 15, 9, 0)
+
+    def test_state_written_from_worker_thread_is_visible(self):
+        import asyncio
+        from app.conversation import get_state, update_state
+        state = get_state("CA-worker-thread")
+        state["step"] = "collect_zip"
+
+        async def write():
+            await asyncio.to_thread(update_state, "CA-worker-thread", state)
+
+        asyncio.run(write())
+        assert get_state("CA-worker-thread")["step"] == "collect_zip"
+
+    def test_unchanged_state_skips_write(self):
+        from unittest.mock import patch
+        from app.conversation import get_state, update_state
+        state = get_state("CA-dirty-flag")
+        state["step"] = state["step"]
+        with patch("app.conversation.SessionLocal") as mock_session:
+            update_state("CA-dirty-flag", state)
+        mock_session.assert_not_called()
+
+        state["step"] = "collect_zip"
+        update_state("CA-dirty-flag", state)
+        assert not state.dirty
+        assert get_state("CA-dirty-flag")["step"] == "collect_zip"
 
 
 # ── Appliance Inference ────────────────────────────────────────────────
 
+APPLIANCE_CASES = (
+    ("my washer is broken", "washer"),
+    ("the washing machine won't start", "washer"),
+    ("dryer is making noise", "dryer"),
+    ("fridge is not cooling", "refrigerator"),
+    ("refrigerator leaking water", "refrigerator"),
+    ("dishwasher won't drain", "dishwasher"),
+    ("oven not heating up", "oven"),
+    ("stove burner broken", "oven"),
+    ("ac is not working", "hvac"),
+    ("air conditioner blowing warm", "hvac"),
+    ("hvac system broken", "hvac"),
+)
+NEGATIVE_CASES = ("hello there", "", "order a pizza", "book a flight")
+
+
 class TestInferApplianceType:
-    @pytest.mark.parametrize("text,expected", [
-        ("my washer is broken", "washer"),
-        ("the washing machine won't start", "washer"),
-        ("dryer is making noise", "dryer"),
-        ("fridge is not cooling", "refrigerator"),
-        ("refrigerator leaking water", "refrigerator"),
-        ("dishwasher won't drain", "dishwasher"),
-        ("oven not heating up", "oven"),
-        ("stove burner broken", "oven"),
-        ("ac is not working", "hvac"),
-        ("air conditioner blowing warm", "hvac"),
-        ("hvac system broken", "hvac"),
-    ])
+    @pytest.mark.parametrize("text,expected", APPLIANCE_CASES)
     def test_known_appliances(self, text, expected):
         assert infer_appliance_type(text) == expected
 
-    def test_unknown_input(self):
-        assert infer_appliance_type("hello there") is None
+    @pytest.mark.parametrize("text", NEGATIVE_CASES)
+    def test_unknown_input(self, text):
+        assert infer_appliance_type(text) is None
 
-    def test_empty_input(self):
-        assert infer_appliance_type("") is None
+    @pytest.mark.parametrize("text,expected", [
+        ("the black machine in my kitchen", None),
+        ("my dryer and my dishwasher both broke", "dishwasher"),
+        ("both washers are leaking", "washer"),
+        ("two air conditioners upstairs", "hvac"),
+        ("the Washing Machine, not the dryer", "washer"),
+    ])
+    def test_whole_word_matching(self, text, expected):
+        assert infer_appliance_type(text) == expected
+
+    def test_case_variants_share_cache_entry(self):
+        from app.conversation import _infer_appliance_type
+        _infer_appliance_type.cache_clear()
+        assert infer_appliance_type("My Dryer") == "dryer"
+        assert infer_appliance_type("my dryer") == "dryer"
+        info = _infer_appliance_type.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
 
 
 # ── Troubleshooting Response Interpretation (keyword fallback) ────────
@@ -117,6 +208,8 @@ class TestTroubleshootingResponseInterpretation:
         "no change",
         "I checked it but nothing happened",
         "I tried that already",
+        "it's not fixed",
+        "nope, still not fixed, it worked for a second",
     ])
     def test_negative_responses_not_resolved(self, text):
         result = llm_interpret_troubleshooting_response(text, "Check the power cord")
@@ -127,6 +220,7 @@ class TestTroubleshootingResponseInterpretation:
         "it worked! it's working now",
         "that helped, all good",
         "problem solved",
+        "no worries, that fixed it",
     ])
     def test_positive_responses_resolved(self, text):
         result = llm_interpret_troubleshooting_response(text, "Check the power cord")
@@ -0,0 +1,38 @@
+"""Tests for app.image_service module — upload wakeup events."""
+import asyncio
+from unittest.mock import patch
+
+from app import image_service
+from app.image_service import discard_upload_event, notify_upload_complete, wait_for_upload
+
+
+class TestUploadEvents:
+    def test_notify_without_waiter_creates_no_entry(self):
+        notify_upload_complete("CA-no-waiter")
+        assert "CA-no-waiter" not in image_service._upload_events
+
+    def test_timed_out_wait_removes_entry(self):
+        assert asyncio.run(wait_for_upload("CA-timeout", timeout=0.01)) is False
+        assert "CA-timeout" not in image_service._upload_events
+
+    def test_notified_wait_returns_true_and_removes_entry(self):
+        async def scenario():
+            waiter = asyncio.create_task(wait_for_upload("CA-notified", timeout=1.0))
+            await asyncio.sleep(0)
+            notify_upload_complete("CA-notified")
+            return await waiter
+
+        assert asyncio.run(scenario()) is True
+        assert "CA-notified" not in image_service._upload_events
+
+    @patch("app.image_service.get_upload_status_by_call_sid", return_value={"analysis_ready": True})
+    def test_analysis_stored_before_registration_returns_immediately(self, mock_status):
+        # A notify that fired before the Event existed was lost; the re-check catches it
+        assert asyncio.run(wait_for_upload("CA-raced", timeout=5.0)) is True
+        mock_status.assert_called_once_with("CA-raced")
+        assert "CA-raced" not in image_service._upload_events
+
+    def test_discard_drops_entry(self):
+        image_service._upload_events["CA-ended"] = asyncio.Event()
+        discard_upload_event("CA-ended")
+        assert "CA-ended" not in image_service._upload_events
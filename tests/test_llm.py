@@ -2,13 +2,34 @@
 import pytest
 from unittest.mock import patch, MagicMock
 
-
+from app.llm import (
+    llm_analyze_customer_intent,
+    llm_extract_name,
+    llm_extract_email,
+    llm_interpret_troubleshooting_response,
+    llm_classify_appliance,
+    llm_extract_symptoms,
+    llm_generate_troubleshooting_steps,
+    _generate_troubleshooting_steps,
+    llm_classify_user_intent,
+    llm_choose_slot,
+    llm_classify_yes_no,
+    llm_extract_time_preference,
+)
+from app.llm_cache import (
+    cached_llm_interpret,
+    clear_interpret_cache,
+    cached_llm_extract_email,
+    clear_email_cache,
+    forget_cached_email,
+)
+
+
+@patch("app.llm.model", None)
 class TestLlmAnalyzeCustomerIntent:
     """Test the autonomous intent detection function."""
 
-    def setup_method(self):
-        from app.llm import llm_analyze_customer_intent
-        self.analyze = llm_analyze_customer_intent
+    analyze = staticmethod(llm_analyze_customer_intent)
 
     def test_empty_input_returns_unclear(self):
         result = self.analyze("")
@@ -19,38 +40,39 @@ class TestLlmAnalyzeCustomerIntent:
         result = self.analyze(None)
         assert result["intent"] == "unclear"
 
-    @patch("app.llm.model", None)
     def test_scheduling_keyword_detected(self):
         result = self.analyze("I want to schedule a technician for my washer")
         assert result["wants_scheduling"] is True
         assert result["appliance_type"] == "washer"
 
-    @patch("app.llm.model", None)
-    def test_appliance_detected_from_keywords(self):
-        result = self.analyze("my refrigerator is broken and leaking water everywhere")
+    @pytest.mark.parametrize("text,appliance", [
+        ("my refrigerator is broken and leaking water everywhere", "refrigerator"),
+        ("the dryer is making a loud noise", "dryer"),
+        ("my dishwasher won't drain", "dishwasher"),
+        ("my air conditioner is blowing warm air", "hvac"),
+        ("the stove burner won't light", "oven"),
+        ("my refrigerator is not cooling", "refrigerator"),
+        ("I need to replace a part", None),
+    ], ids=["refrigerator", "dryer", "dishwasher", "hvac", "oven", "named-beats-generic", "no-embedded-ac"])
+    def test_appliance_detected_from_keywords(self, text, appliance):
+        assert self.analyze(text)["appliance_type"] == appliance
+
+    def test_repeat_utterance_reuses_keyword_scan(self):
+        from app.llm import _keyword_intent
+        _keyword_intent.cache_clear()
+        first = self.analyze("My Washer is leaking")
+        second = self.analyze("my washer is LEAKING")
+        assert _keyword_intent.cache_info().hits == 1
+        assert first["symptoms"] == "My Washer is leaking"
+        assert second["symptoms"] == "my washer is LEAKING"
+        assert first["appliance_type"] == second["appliance_type"] == "washer"
+
+    def test_model_failure_uses_same_keyword_table(self):
+        with patch("app.llm.model") as mock_model:
+            mock_model.generate_content.side_effect = RuntimeError("quota")
+            result = self.analyze("the freezer section is not cooling at all anymore")
         assert result["appliance_type"] == "refrigerator"
 
-    @patch("app.llm.model", None)
-    def test_dryer_detected(self):
-        result = self.analyze("the dryer is making a loud noise")
-        assert result["appliance_type"] == "dryer"
-
-    @patch("app.llm.model", None)
-    def test_dishwasher_detected(self):
-        result = self.analyze("my dishwasher won't drain")
-        assert result["appliance_type"] == "dishwasher"
-
-    @patch("app.llm.model", None)
-    def test_hvac_detected(self):
-        result = self.analyze("my air conditioner is blowing warm air")
-        assert result["appliance_type"] == "hvac"
-
-    @patch("app.llm.model", None)
-    def test_oven_detected(self):
-        result = self.analyze("the stove burner won't light")
-        assert result["appliance_type"] == "oven"
-
-    @patch("app.llm.model", None)
     def test_full_description_detected(self):
         result = self.analyze(
             "My washer is making a really loud banging noise during the spin cycle "
@@ -59,121 +81,392 @@ class TestLlmAnalyzeCustomerIntent:
         assert result["appliance_type"] == "washer"
         assert result["has_full_description"] is True
 
-    @patch("app.llm.model", None)
     def test_no_appliance_returns_unclear(self):
         result = self.analyze("hello")
         assert result["intent"] == "unclear"
         assert result["appliance_type"] is None
 
+    def test_symptom_keyword_not_matched_inside_word(self):
+        result = self.analyze("I need service for my washer")
+        assert result["appliance_type"] == "washer"
+        assert result["has_full_description"] is False
+
 
+@patch("app.llm.model", None)
 class TestLlmExtractName:
     """Test name extraction with fallback."""
 
-    def setup_method(self):
-        from app.llm import llm_extract_name
-        self.extract = llm_extract_name
+    extract = staticmethod(llm_extract_name)
 
-    @patch("app.llm.model", None)
     def test_simple_name(self):
         result = self.extract("My name is John")
         assert result is not None
         assert "john" in result.lower() or "John" in result
 
-    @patch("app.llm.model", None)
     def test_name_with_im(self):
         result = self.extract("I'm Sarah")
         assert result is not None
 
-    @patch("app.llm.model", None)
     def test_empty_returns_none_or_fallback(self):
         result = self.extract("")
         # Without LLM model, empty input returns None (caller handles fallback)
         assert result is None or isinstance(result, str)
 
 
+@patch("app.llm.model", None)
 class TestLlmExtractEmail:
     """Test email extraction with deterministic pre-processing."""
 
-    def setup_method(self):
-        from app.llm import llm_extract_email
-        self.extract = llm_extract_email
+    extract = staticmethod(llm_extract_email)
 
-    @patch("app.llm.model", None)
     def test_plain_email(self):
         result = self.extract("john@gmail.com")
         assert "@" in result
         assert "gmail" in result.lower()
 
-    @patch("app.llm.model", None)
     def test_spelled_out_email(self):
         result = self.extract("j o h n at gmail dot com")
         assert "@" in result
         assert ".com" in result
 
-    @patch("app.llm.model", None)
     def test_at_the_rate_normalization(self):
         result = self.extract("john at the rate gmail dot com")
         assert "@" in result
 
-    @patch("app.llm.model", None)
+    @pytest.mark.parametrize("speech,expected", [
+        ("sam at sign jmail dot co dot uk", "sam @ gmail .co.uk"),
+        ("my email is S. H. I. N. Y. at yahoo.com", "shiny @ yahoo.com"),
+        ("bob a great icloud dot io", "bob @ icloud .io"),
+    ])
+    def test_spoken_forms_normalized(self, speech, expected):
+        from app.llm import _normalize_speech_for_email
+        assert _normalize_speech_for_email(speech) == expected
+
     def test_empty_input(self):
         result = self.extract("")
         assert result is not None  # Should return a constructed email
 
 
+@patch("app.llm.model", None)
 class TestLlmInterpretTroubleshootingResponse:
     """Test troubleshooting response interpretation."""
 
-    def setup_method(self):
-        from app.llm import llm_interpret_troubleshooting_response
-        self.interpret = llm_interpret_troubleshooting_response
+    interpret = staticmethod(llm_interpret_troubleshooting_response)
 
-    @patch("app.llm.model", None)
     def test_positive_response(self):
         result = self.interpret("yes that worked!", "Check the power cord")
         assert result["is_resolved"] is True
 
-    @patch("app.llm.model", None)
     def test_negative_response(self):
         result = self.interpret("no it's still not working", "Check the power cord")
         assert result["is_resolved"] is False
 
-    @patch("app.llm.model", None)
     def test_ambiguous_negative(self):
         result = self.interpret("I checked but still broken", "Check the power cord")
         assert result["is_resolved"] is False
 
+    @pytest.mark.parametrize("text,confidence", [
+        ("Nope", "medium"),
+        ("I already tried that", "medium"),
+        ("The knowledge base says nothing", "low"),  # "no" only as a whole word
+        ("IT WORKED", "medium"),
+    ])
+    def test_keyword_fallback_matching(self, text, confidence):
+        result = self.interpret(text, "Check the power cord")
+        assert result["confidence"] == confidence
 
+
+@patch("app.llm.model", None)
 class TestLlmClassifyAppliance:
     """Test appliance classification."""
 
-    def setup_method(self):
-        from app.llm import llm_classify_appliance
-        self.classify = llm_classify_appliance
+    classify = staticmethod(llm_classify_appliance)
 
-    @patch("app.llm.model", None)
     def test_returns_none_without_model(self):
         # Without model, classification returns None (falls back to keyword in routes)
         result = self.classify("my washer is broken")
         # May return None or a value depending on fallback logic
         assert result is None or result in {"washer", "dryer", "refrigerator", "dishwasher", "oven", "hvac"}
 
+    @pytest.mark.parametrize("answer,expected", [("Washer\n", "washer"), ("other", None), ("toaster", None)])
+    def test_model_answer_maps_to_canonical_type(self, answer, expected):
+        from app.conversation import infer_appliance_type
+        with patch("app.llm.model") as mock_model:
+            mock_model.generate_content.return_value = MagicMock(text=answer)
+            result = self.classify("it's the thing in the laundry room")
+        assert result == expected
+        if expected:
+            assert result is infer_appliance_type(f"my {expected}")
+
 
+@patch("app.llm.model", None)
 class TestLlmExtractSymptoms:
     """Test symptom extraction."""
 
-    def setup_method(self):
-        from app.llm import llm_extract_symptoms
-        self.extract = llm_extract_symptoms
+    extract = staticmethod(llm_extract_symptoms)
 
-    @patch("app.llm.model", None)
     def test_returns_fallback_dict(self):
         result = self.extract("it's making a loud noise and leaking")
         assert "symptom_summary" in result
         assert "error_codes" in result
         assert "is_urgent" in result
 
-    @patch("app.llm.model", None)
     def test_empty_input(self):
         result = self.extract("")
         assert "symptom_summary" in result
+
+    def test_error_code_fast_path_skips_model(self):
+        with patch("app.llm.model") as mock_model:
+            result = self.extract("it says F 21")
+        mock_model.generate_content.assert_not_called()
+        assert result["error_codes"] == ["F21"]
+        assert "F21" in result["symptom_summary"]
+
+    def test_error_code_with_symptoms_uses_model(self):
+        with patch("app.llm.model") as mock_model:
+            mock_model.generate_content.return_value.text = (
+                '{"symptom_summary": "Your washer is leaking", "error_codes": ["E3"], "is_urgent": false}'
+            )
+            result = self.extract("E3 and it's leaking")
+        mock_model.generate_content.assert_called_once()
+        assert result["symptom_summary"] == "Your washer is leaking"
+
+    def test_code_with_symptom_keeps_symptom_and_code(self):
+        with patch("app.llm.model") as mock_model:
+            mock_model.generate_content.return_value.text = (
+                '{"symptom_summary": "Your fridge is leaking", "error_codes": [], "is_urgent": false}'
+            )
+            result = self.extract("my fridge leaks, code E5")
+        mock_model.generate_content.assert_called_once()
+        assert result["symptom_summary"] == "Your fridge is leaking"
+        assert result["error_codes"] == ["E5"]
+
+    @patch("app.llm.model", None)
+    def test_code_with_symptom_without_model_keeps_text_and_code(self):
+        result = self.extract("my fridge leaks, code E5")
+        assert result["symptom_summary"] == "my fridge leaks, code E5"
+        assert result["error_codes"] == ["E5"]
+
+    @pytest.mark.parametrize("text", ["press u 2 times", "option e 5"])
+    @patch("app.llm.model", None)
+    def test_spaced_single_digit_is_not_a_code(self, text):
+        assert self.extract(text)["error_codes"] == []
+
+
+class TestLlmGenerateTroubleshootingSteps:
+    """Test troubleshooting step generation caching."""
+
+    generate = staticmethod(llm_generate_troubleshooting_steps)
+
+    def setup_method(self):
+        _generate_troubleshooting_steps.cache_clear()
+
+    @patch("app.llm.model", None)
+    def test_empty_without_model(self):
+        assert self.generate("washer", "won't spin") == ""
+
+    def test_repeat_call_is_cached(self):
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = "Step 1: Check the plug. Step 2: Reset it."
+        with patch("app.llm.model", mock_model):
+            first = self.generate("Washer", "won't spin")
+            second = self.generate("washer", "won't spin")
+        assert first == second
+        assert mock_model.generate_content.call_count == 1
+
+    def test_blank_and_padded_inputs_share_entry(self):
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = "Step 1: Clean the lint trap."
+        with patch("app.llm.model", mock_model):
+            self.generate("  Dryer ", None)
+            self.generate("dryer", "  ")
+            self.generate("dryer")
+        assert mock_model.generate_content.call_count == 1
+
+    def test_failure_is_not_cached(self):
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = "Sorry, I can't help."
+        with patch("app.llm.model", mock_model):
+            assert self.generate("dryer") == ""
+            assert self.generate("dryer") == ""
+        assert mock_model.generate_content.call_count == 2
+
+
+@patch("app.llm.model", None)
+class TestLlmClassifyUserIntentFallback:
+    """Test the keyword fallback of llm_classify_user_intent."""
+
+    classify = staticmethod(llm_classify_user_intent)
+
+    def test_whole_word_match(self):
+        result = self.classify("please send someone out", ["select_slot", "schedule"])
+        assert result["choice"] == "schedule"
+
+    def test_phrase_match(self):
+        result = self.classify("I'll call back later", ["troubleshoot", "callback"])
+        assert result["choice"] == "callback"
+
+    def test_no_match_is_unclear(self):
+        result = self.classify("hmm", ["troubleshoot", "schedule"])
+        assert result["choice"] == "unclear"
+
+
+class TestLlmChooseSlot:
+    """Test the regex fast path of llm_choose_slot."""
+
+    choose = staticmethod(llm_choose_slot)
+
+    @pytest.mark.parametrize("text,expected", [
+        ("option 2", 1),
+        ("I'll take option three please", 2),
+        ("The first one.", 0),
+        ("3rd", 2),
+        ("1", 0),
+    ])
+    @patch("app.llm.model", None)
+    def test_option_picks_without_model(self, text, expected):
+        assert self.choose(text, "0: Mon 9 AM\n1: Tue 1 PM\n2: Wed 3 PM") == expected
+
+    @patch("app.llm.model", None)
+    def test_phone_is_not_one(self):
+        assert self.choose("can you call my phone", "0: Mon 9 AM") is None
+
+    @patch("app.llm.model")
+    def test_time_mention_goes_to_model(self, mock_model):
+        mock_model.generate_content.return_value = MagicMock(text="1")
+        assert self.choose("the 1 PM slot", "0: Mon 9 AM\n1: Tue 1 PM") == 1
+        mock_model.generate_content.assert_called_once()
+
+
+class TestLlmClassifyYesNo:
+    """Test the single-word fast path of llm_classify_yes_no."""
+
+    @pytest.mark.parametrize("text,expected", [
+        ("Yes.", "yes"),
+        ("  okay ", "yes"),
+        ("Nope!", "no"),
+        ("incorrect", "no"),
+    ])
+    @patch("app.llm.model")
+    def test_bare_reply_skips_model(self, mock_model, text, expected):
+        assert llm_classify_yes_no(text)["intent"] == expected
+        mock_model.generate_content.assert_not_called()
+
+    @patch("app.llm.model")
+    def test_correction_goes_to_model(self, mock_model):
+        mock_model.generate_content.return_value = MagicMock(
+            text='{"intent": "correction", "correction_value": "60604"}'
+        )
+        result = llm_classify_yes_no("no it's 60604")
+        assert result == {"intent": "correction", "correction_value": "60604"}
+
+
+class TestLlmExtractTimePreference:
+    """Test the single-word shortcut of llm_extract_time_preference."""
+
+    @pytest.mark.parametrize("text,expected", [
+        ("Morning.", "morning"),
+        ("afternoon", "afternoon"),
+        ("evening!", "afternoon"),
+    ])
+    @patch("app.llm.model")
+    def test_single_word_reply_skips_model(self, mock_model, text, expected):
+        assert llm_extract_time_preference(text) == expected
+        mock_model.generate_content.assert_not_called()
+
+    @pytest.mark.parametrize("text,expected", [
+        ("early afternoon please", "afternoon"),
+        ("later in the morning", "morning"),
+    ])
+    @patch("app.llm.model")
+    def test_qualified_reply_goes_to_model(self, mock_model, text, expected):
+        mock_model.generate_content.return_value = MagicMock(text=expected)
+        assert llm_extract_time_preference(text) == expected
+        mock_model.generate_content.assert_called_once()
+
+    @pytest.mark.parametrize("text,expected", [
+        ("I guess the evening works", "afternoon"),
+        ("probably morning", "morning"),
+        ("whenever mornings are free", "morning"),
+        ("any time is fine", None),
+        ("early afternoon please", "afternoon"),
+        ("later in the morning", "morning"),
+    ])
+    @patch("app.llm.model", None)
+    def test_keyword_fallback_matches_whole_words(self, text, expected):
+        assert llm_extract_time_preference(text) == expected
+
+
+class TestCachedLlmInterpret:
+    """Test the exact-match cache in front of troubleshooting interpretation."""
+
+    interpret = staticmethod(cached_llm_interpret)
+
+    def setup_method(self):
+        clear_interpret_cache()
+
+    @patch("app.llm_cache.llm_interpret_troubleshooting_response")
+    def test_normalized_repeat_is_cached(self, mock_interpret):
+        mock_interpret.return_value = {"is_resolved": False, "confidence": "high", "interpretation": "x"}
+        first = self.interpret("No, it didn't work.", "Step 1: Check the plug.")
+        second = self.interpret("no it didn't work", "Step 1: Check the plug.")
+        assert first == second
+        assert mock_interpret.call_count == 1
+
+    @patch("app.llm_cache.llm_interpret_troubleshooting_response")
+    def test_different_steps_not_shared(self, mock_interpret):
+        mock_interpret.return_value = {"is_resolved": False, "confidence": "high", "interpretation": "x"}
+        self.interpret("no", "Step 1: Check the plug.")
+        self.interpret("no", "Step 1: Clean the filter.")
+        assert mock_interpret.call_count == 2
+
+    @patch("app.llm_cache.llm_interpret_troubleshooting_response")
+    def test_low_confidence_not_cached(self, mock_interpret):
+        mock_interpret.return_value = {"is_resolved": False, "confidence": "low", "interpretation": "x"}
+        self.interpret("hmm", "Step 1: Check the plug.")
+        self.interpret("hmm", "Step 1: Check the plug.")
+        assert mock_interpret.call_count == 2
+
+
+class TestCachedLlmExtractEmail:
+    """Test the normalized-speech cache in front of email extraction."""
+
+    extract = staticmethod(cached_llm_extract_email)
+
+    def setup_method(self):
+        clear_email_cache()
+
+    @patch("app.llm_cache.extract_email_with_source")
+    def test_retry_with_different_punctuation_is_cached(self, mock_extract):
+        mock_extract.return_value = ("kasi@gmail.com", "llm")
+        first = self.extract("K. A. S. I at gmail dot com")
+        second = self.extract("k a s i at gmail dot com")
+        assert first == second == "kasi@gmail.com"
+        assert mock_extract.call_count == 1
+
+    @patch("app.llm_cache.extract_email_with_source")
+    def test_empty_speech_not_cached(self, mock_extract):
+        mock_extract.return_value = ("customer@email.com", "fallback")
+        self.extract("")
+        self.extract("")
+        assert mock_extract.call_count == 2
+
+    @pytest.mark.parametrize("result", [
+        ("kasi@gmail.com", "fallback"),
+        ("kasi@gmail.com", "regex"),
+        ("kasi at gmail", "llm"),
+    ], ids=["fallback", "regex", "invalid-llm-answer"])
+    @patch("app.llm_cache.extract_email_with_source")
+    def test_only_valid_llm_answers_cached(self, mock_extract, result):
+        mock_extract.return_value = result
+        self.extract("k a s i at gmail")
+        self.extract("k a s i at gmail")
+        assert mock_extract.call_count == 2
+
+    @patch("app.llm_cache.extract_email_with_source")
+    def test_forgotten_email_is_extracted_again(self, mock_extract):
+        mock_extract.return_value = ("kasi@gmail.com", "llm")
+        self.extract("k a s i at gmail")
+        forget_cached_email("K. A. S. I at gmail")
+        self.extract("k a s i at gmail")
+        assert mock_extract.call_count == 2
@@ -0,0 +1,108 @@
+"""Tests for app.scheduling module — slot lookup cache."""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.db import SessionLocal
+from app.models import AvailabilitySlot, Technician, TechnicianServiceArea, TechnicianSpecialty
+from app.scheduling import (
+    book_appointment,
+    clear_slots_cache,
+    find_available_slots,
+    format_slot_for_speech,
+    format_slot_hour,
+    get_slots_by_ids,
+)
+
+
+def _seed_slot(zip_code: str, appliance_type: str) -> int:
+    db = SessionLocal()
+    try:
+        tech = Technician(name="Test Tech", phone=f"555-{zip_code}", email=f"{zip_code}@example.com")
+        db.add(tech)
+        db.flush()
+        db.add(TechnicianServiceArea(technician_id=tech.id, zip_code=zip_code))
+        db.add(TechnicianSpecialty(technician_id=tech.id, appliance_type=appliance_type))
+        start = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        slot = AvailabilitySlot(technician_id=tech.id, start_time=start, end_time=start + timedelta(hours=2))
+        db.add(slot)
+        db.commit()
+        return slot.id
+    finally:
+        db.close()
+
+
+class TestFindAvailableSlotsCache:
+    def setup_method(self):
+        clear_slots_cache()
+
+    def test_repeat_lookup_served_from_cache(self):
+        _seed_slot("90001", "washer")
+        first = find_available_slots("90001", "washer", "morning")
+        with patch("app.scheduling.SessionLocal") as mock_session:
+            second = find_available_slots("90001", "washer", "morning")
+        mock_session.assert_not_called()
+        assert second == first
+        second[0]["technician_name"] = "changed"
+        assert find_available_slots("90001", "washer", "morning")[0]["technician_name"] == "Test Tech"
+
+    def test_booking_invalidates_cache(self):
+        slot_id = _seed_slot("90002", "dryer")
+        assert len(find_available_slots("90002", "dryer")) == 1
+        book_appointment("CA-cache", "+15550000000", "90002", "dryer", "", [], False, slot_id)
+        assert find_available_slots("90002", "dryer") == []
+
+
+class TestGetSlotsByIds:
+    def setup_method(self):
+        clear_slots_cache()
+
+    def test_offered_slot_details_served_from_memory(self):
+        _seed_slot("90003", "oven")
+        offered = find_available_slots("90003", "oven")
+        db = SessionLocal()
+        try:
+            db.query(Technician).filter(Technician.phone == "555-90003").update({"name": "Renamed"})
+            db.commit()
+        finally:
+            db.close()
+        assert get_slots_by_ids([offered[0]["slot_id"]]) == offered
+
+    def test_cached_slot_booked_elsewhere_comes_back_none(self):
+        slot_id = _seed_slot("90006", "oven")
+        offered = find_available_slots("90006", "oven")
+        db = SessionLocal()
+        try:
+            db.get(AvailabilitySlot, slot_id).is_booked = True
+            db.commit()
+        finally:
+            db.close()
+        assert get_slots_by_ids([offered[0]["slot_id"]]) == [None]
+
+    def test_unknown_ids_fall_back_to_database(self):
+        slot_id = _seed_slot("90004", "oven")
+        slots = get_slots_by_ids([slot_id, 999999])
+        assert slots[0]["slot_id"] == slot_id
+        assert slots[1] is None
+        assert slots[0]["technician_name"] == "Test Tech"
+
+    def test_missing_id_keeps_its_position(self):
+        slot_id = _seed_slot("90005", "oven")
+        slots = get_slots_by_ids([999998, slot_id])
+        assert slots[0] is None
+        assert slots[1]["slot_id"] == slot_id
+
+
+class TestFormatSlotForSpeech:
+    @pytest.mark.parametrize("hour,expected", [
+        (0, "12 AM"), (9, "9 AM"), (12, "12 PM"), (13, "1 PM"), (23, "11 PM"),
+    ])
+    def test_format_slot_hour(self, hour, expected):
+        assert format_slot_hour(datetime(2030, 1, 7, hour)) == expected
+
+    def test_speech_text(self):
+        slot = {"start_time": datetime(2030, 1, 7, 14), "technician_name": "Ann"}
+        assert format_slot_for_speech(slot, 2) == (
+            "Option 2: Monday, January 07, afternoon at 2 PM with Ann"
+        )
@@ -1,6 +1,31 @@
 """Tests for app.seed module — seed data integrity and advisory lock."""
+import re
+
 import pytest
-from app.seed import TECHNICIANS_DATA
+from app.seed import (
+    TECHNICIANS_DATA, TECH_NAMES, TECH_PHONES, TECH_EMAILS, TECH_ZIPS, TECH_SPECIALTIES,
+)
+
+_ZIP_RE = re.compile(r"[0-9]{5}")
+_VALID_SPECIALTIES = frozenset({"washer", "dryer", "refrigerator", "dishwasher", "oven", "hvac"})
+
+
+def _duplicates(values):
+    """Values appearing more than once, found by sorting and comparing neighbours."""
+    ordered = sorted(values)
+    return sorted({a for a, b in zip(ordered, ordered[1:]) if a == b})
+
+
+@pytest.fixture(scope="module")
+def flat_zips():
+    """Every service-area ZIP across all technicians, flattened once."""
+    return [z for zip_codes in TECH_ZIPS for z in zip_codes]
+
+
+@pytest.fixture(scope="module")
+def flat_specialties():
+    """Every specialty across all technicians, flattened once."""
+    return [s for specialties in TECH_SPECIALTIES for s in specialties]
 
 
 class TestSeedData:
@@ -16,29 +41,28 @@ class TestSeedData:
             assert isinstance(zip_codes, list) and len(zip_codes) > 0
             assert isinstance(specialties, list) and len(specialties) > 0
 
-    def test_all_zip_codes_are_5_digits(self):
-        for _, _, _, zip_codes, _ in TECHNICIANS_DATA:
-            for z in zip_codes:
-                assert len(z) == 5 and z.isdigit(), f"Invalid ZIP: {z}"
+    def test_column_views_match_rows(self):
+        assert len(TECH_NAMES) == len(TECHNICIANS_DATA)
+        for i, row in enumerate(TECHNICIANS_DATA):
+            assert row == (TECH_NAMES[i], TECH_PHONES[i], TECH_EMAILS[i], TECH_ZIPS[i], TECH_SPECIALTIES[i])
+
+    def test_all_zip_codes_are_5_digits(self, flat_zips):
+        invalid = [z for z in flat_zips if not _ZIP_RE.fullmatch(z)]
+        assert not invalid, f"Invalid ZIPs: {invalid}"
 
-    def test_all_specialties_are_valid(self):
-        valid = {"washer", "dryer", "refrigerator", "dishwasher", "oven", "hvac"}
-        for _, _, _, _, specialties in TECHNICIANS_DATA:
-            for s in specialties:
-                assert s in valid, f"Invalid specialty: {s}"
+    def test_all_specialties_are_valid(self, flat_specialties):
+        invalid = set(flat_specialties) - _VALID_SPECIALTIES
+        assert not invalid, f"Invalid specialties: {invalid}"
 
     def test_unique_emails(self):
-        emails = [email for _, _, email, _, _ in TECHNICIANS_DATA]
-        assert len(emails) == len(set(emails)), "Duplicate emails in seed data"
+        dupes = _duplicates(TECH_EMAILS)
+        assert not dupes, f"Duplicate emails in seed data: {dupes}"
 
     def test_unique_phones(self):
-        phones = [phone for _, phone, _, _, _ in TECHNICIANS_DATA]
-        assert len(phones) == len(set(phones)), "Duplicate phones in seed data"
+        dupes = _duplicates(TECH_PHONES)
+        assert not dupes, f"Duplicate phones in seed data: {dupes}"
 
-    def test_geographic_coverage(self):
+    def test_geographic_coverage(self, flat_zips):
         """Verify all 10 ZIP codes are covered."""
-        all_zips = set()
-        for _, _, _, zip_codes, _ in TECHNICIANS_DATA:
-            all_zips.update(zip_codes)
         expected = {"60115", "60601", "60602", "60611", "10001", "10002", "11201", "94105", "75201", "30301"}
-        assert all_zips == expected
+        assert set(flat_zips) == expected
@@ -0,0 +1,25 @@
+"""Tests for app.ttl_cache module — shared expiring LRU cache."""
+from unittest.mock import patch
+
+from app.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    def test_entry_expires_after_ttl(self):
+        cache = TTLCache(max_entries=4, ttl_seconds=10)
+        with patch("app.ttl_cache.time.monotonic", return_value=100.0):
+            cache.put("k", "v")
+        with patch("app.ttl_cache.time.monotonic", return_value=109.0):
+            assert cache.get("k") == "v"
+        with patch("app.ttl_cache.time.monotonic", return_value=111.0):
+            assert cache.get("k") is None
+
+    def test_least_recently_used_entry_evicted(self):
+        cache = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
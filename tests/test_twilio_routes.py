@@ -1,21 +1,59 @@
 """Tests for app.twilio_routes module — TTS, email readback, helpers, and route handlers."""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from fastapi.testclient import TestClient
+from twilio.twiml.voice_response import VoiceResponse
+
+import app.twilio_routes as routes
+from app.config import APP_BASE_URL, STT_SPEECH_MODEL, TTS_VOICE
+from app.llm import llm_classify_yes_no
+from app.main import app
+from app.twilio_routes import (
+    STATIC_TWIML,
+    _STATIC_HANGUP_TEXT,
+    _add_media_stream,
+    _background_tasks,
+    _build_gather,
+    _get_continue_url,
+    _parse_confidence,
+    _render_simple_twiml,
+    _send_upload_email_later,
+    _spell_email_slow,
+    _twiml_response,
+    create_ssml_say,
+    speak_email_naturally,
+)
+
+
+FORM_HEADERS = {"content-type": "application/x-www-form-urlencoded"}
+
+
+def encode_form(fields):
+    """Twilio-style webhook body, urlencoded up front and posted as raw bytes."""
+    return urlencode(fields).encode()
+
+
+def assert_any_in(text, *needles):
+    """Case-insensitive: at least one needle occurs in text (lowercased once)."""
+    lowered = text.lower()
+    assert any(needle in lowered for needle in needles), f"none of {needles} in {text!r}"
 
 
 # ── Helper function tests (no DB needed) ───────────────────────────────
 
 class TestSpeakEmailNaturally:
-    def setup_method(self):
-        from app.twilio_routes import speak_email_naturally
-        self.speak = speak_email_naturally
+    speak = staticmethod(speak_email_naturally)
 
     def test_basic_email(self):
         result = self.speak("john@gmail.com")
         assert "john at gmail dot com" in result
-        assert "spell" in result.lower()
-        assert "correct" in result.lower()
+        assert_any_in(result, "spell")
+        assert_any_in(result, "correct")
 
     def test_email_with_dot_in_username(self):
         result = self.speak("kasi.majji@gmail.com")
@@ -38,9 +76,7 @@ class TestSpeakEmailNaturally:
 
 
 class TestSpellEmailSlow:
-    def setup_method(self):
-        from app.twilio_routes import _spell_email_slow
-        self.spell = _spell_email_slow
+    spell = staticmethod(_spell_email_slow)
 
     def test_basic_email(self):
         result = self.spell("a@b.com")
@@ -58,115 +94,202 @@ class TestSpellEmailSlow:
     def test_none(self):
         assert self.spell(None) == ""
 
+    def test_result_is_memoized(self):
+        self.spell.cache_clear()
+        self.spell("cached@example.com")
+        self.spell("cached@example.com")
+        assert self.spell.cache_info().hits == 1
+
 
 class TestLlmClassifyYesNo:
     """Test the LLM-powered yes/no classifier (keyword fallback when model is None)."""
-    def setup_method(self):
-        from app.llm import llm_classify_yes_no
-        self.classify = llm_classify_yes_no
-
-    @pytest.mark.parametrize("text", ["yes", "yeah", "yep", "correct", "ok", "okay", "that's right"])
-    def test_yes_responses(self, text):
-        result = self.classify(text)
-        assert result["intent"] == "yes"
+    classify = staticmethod(llm_classify_yes_no)
 
-    @pytest.mark.parametrize("text", ["no", "nope", "wrong", "incorrect", "try again"])
-    def test_no_responses(self, text):
-        result = self.classify(text)
-        assert result["intent"] == "no"
-
-    def test_yes_not_no(self):
-        assert self.classify("yes")["intent"] == "yes"
-        assert self.classify("yes")["intent"] != "no"
-
-    def test_no_not_yes(self):
-        assert self.classify("no")["intent"] == "no"
-        assert self.classify("no")["intent"] != "yes"
+    @pytest.mark.parametrize("text,expected_yes,expected_no", [
+        *((text, True, False) for text in ["yes", "yeah", "yep", "correct", "ok", "okay", "that's right"]),
+        *((text, False, True) for text in ["no", "nope", "wrong", "incorrect", "try again"]),
+    ])
+    def test_yes_no(self, text, expected_yes, expected_no):
+        intent = self.classify(text)["intent"]
+        assert (intent == "yes") is expected_yes
+        assert (intent == "no") is expected_no
 
 
 class TestCreateSsmlSay:
     def test_returns_say_object(self):
-        from app.twilio_routes import create_ssml_say
         say = create_ssml_say("Hello world")
         xml = str(say)
         assert "Hello world" in xml
 
     def test_uses_neural_voice(self):
-        from app.twilio_routes import create_ssml_say
-        from app.config import TTS_VOICE
         say = create_ssml_say("test")
         xml = str(say)
         assert TTS_VOICE in xml
 
+    def test_each_call_builds_an_independent_say(self):
+        first, second = VoiceResponse(), VoiceResponse()
+        first.append(create_ssml_say("Shared prompt"))
+        second.append(create_ssml_say("Shared prompt"))
+        assert create_ssml_say("Shared prompt") is not create_ssml_say("Shared prompt")
+        assert str(first) == str(second)
+        assert "Shared prompt" in str(second)
 
-class TestBuildGather:
-    def test_gather_has_speech_model(self):
-        from twilio.twiml.voice_response import VoiceResponse
-        from app.twilio_routes import _build_gather
-        from app.config import STT_SPEECH_MODEL
 
+class TestBuildGather:
+    @pytest.mark.parametrize("kwargs,attr,expected", [
+        ({"timeout": 5}, "speechModel", STT_SPEECH_MODEL),
+        ({}, "bargeIn", False),
+        ({"hints": "gmail.com, yahoo.com"}, "hints", "gmail.com, yahoo.com"),
+    ], ids=["speech-model", "barge-in-false", "hints"])
+    def test_gather_attributes(self, kwargs, attr, expected):
+        # Inspect the Gather node directly; serializing the TwiML isn't needed for attribute checks
         resp = VoiceResponse()
-        _build_gather(resp, "https://example.com/continue", timeout=5)
-        xml = str(resp)
-        assert STT_SPEECH_MODEL in xml
-
-    def test_gather_barge_in_false(self):
-        from twilio.twiml.voice_response import VoiceResponse
-        from app.twilio_routes import _build_gather
+        _build_gather(resp, "https://example.com/continue", **kwargs)
+        gather = resp.verbs[-1]
+        assert gather.name == "Gather"
+        assert gather.attrs[attr] == expected
 
+    def test_barge_in_serializes_false(self):
         resp = VoiceResponse()
         _build_gather(resp, "https://example.com/continue")
-        xml = str(resp)
-        assert 'bargeIn="false"' in xml
+        assert 'bargeIn="false"' in str(resp)
 
-    def test_gather_with_hints(self):
-        from twilio.twiml.voice_response import VoiceResponse
-        from app.twilio_routes import _build_gather
+
+class TestRenderSimpleTwiml:
+    @pytest.mark.parametrize("kwargs", [
+        {},
+        {"hints": "gmail.com, yahoo.com", "language": "en-US"},
+        {"stream_url": "wss://example.com/twilio/media-stream"},
+    ])
+    def test_matches_voice_response(self, kwargs):
+        text = 'Say "yes" & <continue>'
+        url = "https://example.com/continue?a=1&b=2"
+        stream_url = kwargs.pop("stream_url", None)
 
         resp = VoiceResponse()
-        _build_gather(resp, "https://example.com/continue", hints="gmail.com, yahoo.com")
-        xml = str(resp)
-        assert "gmail.com" in xml
+        if stream_url:
+            _add_media_stream(resp, stream_url)
+        gather = _build_gather(resp, url, timeout=7, speech_timeout="auto", **kwargs)
+        gather.append(create_ssml_say(text))
+        resp.redirect(url)
+
+        fast = _render_simple_twiml(
+            text, url, timeout=7, speech_timeout="auto", stream_url=stream_url, **kwargs
+        )
+        assert fast == str(resp)
+
+
+class TestTwimlResponse:
+    def test_bytes_match_voice_response_str(self):
+        response = VoiceResponse()
+        response.append(create_ssml_say("Café & co — \"quoted\""))
+        response.hangup()
+
+        rendered = _twiml_response(response)
+        assert rendered.body == str(response).encode("utf-8")
+        assert rendered.media_type == "application/xml"
+
+    def test_static_twiml_matches_rendered_response(self):
+        for key, text in _STATIC_HANGUP_TEXT.items():
+            response = VoiceResponse()
+            response.append(create_ssml_say(text))
+            response.hangup()
+            assert STATIC_TWIML[key] == str(response).encode("utf-8")
+
+
+class TestSendUploadEmailLater:
+    @patch("app.twilio_routes.send_upload_email")
+    def test_email_sent_in_background_task(self, mock_send):
+        async def run():
+            _send_upload_email_later("a@b.com", "http://localhost/upload/t", "washer")
+            assert len(_background_tasks) == 1
+            await asyncio.gather(*list(_background_tasks))
+
+        asyncio.run(run())
+        mock_send.assert_called_once_with("a@b.com", "http://localhost/upload/t", "washer")
+        assert not _background_tasks
 
 
 class TestGetContinueUrl:
     def test_uses_host_header(self):
-        from app.twilio_routes import _get_continue_url
-
-        mock_request = MagicMock()
-        mock_request.headers = {
+        request = SimpleNamespace(headers={
             "host": "abc.ngrok-free.app",
             "x-forwarded-proto": "https",
-        }
-        url = _get_continue_url(mock_request)
+        })
+        url = _get_continue_url(request)
         assert url == "https://abc.ngrok-free.app/twilio/voice/continue"
 
     def test_fallback_to_app_base_url(self):
-        from app.twilio_routes import _get_continue_url
-        from app.config import APP_BASE_URL
-
-        mock_request = MagicMock()
-        mock_request.headers = {}
-        url = _get_continue_url(mock_request)
+        url = _get_continue_url(SimpleNamespace(headers={}))
         assert url == f"{APP_BASE_URL}/twilio/voice/continue"
 
 
+class TestParseConfidence:
+    @pytest.mark.parametrize("raw,expected", [
+        ("0.87", 0.87),
+        ("0", 0.0),
+        ("", None),
+        ("abc", None),
+    ])
+    def test_parse(self, raw, expected):
+        assert _parse_confidence(raw) == expected
+
+
 # ── Route handler tests (mock DB) ─────────────────────────────────────
 
+@pytest.fixture
+def twilio_mocks(monkeypatch):
+    """Stubs the conversation-state store and call logging used by the routes."""
+    mocks = SimpleNamespace(
+        get_state=MagicMock(),
+        update_state=MagicMock(),
+        log_call_start=MagicMock(),
+        log_conversation=MagicMock(),
+    )
+    for name, mock in vars(mocks).items():
+        monkeypatch.setattr(routes, name, mock)
+    return mocks
+
+
+@pytest.fixture
+def state_factory():
+    """Builds a route-test state dict from a shared base; keyword overrides win."""
+    def make(**overrides):
+        state = {
+            "step": "greet_ask_name",
+            "no_input_attempts": 0,
+            "customer_phone": None,
+            "customer_name": None,
+            "zip_attempts": 0,
+            "zip_code": None,
+        }
+        state.update(overrides)
+        return state
+    return make
+
+
+@pytest.fixture(scope="module")
+def client():
+    """
+    One TestClient session for every route test. Entering it runs the startup
+    hooks once and keeps a single event-loop portal for all requests; seeding
+    (MySQL advisory lock) and the Gemini warmup are stubbed out for SQLite.
+    """
+    with patch("app.main.seed_data"), patch("app.main.warmup_vision", new=AsyncMock()):
+        with TestClient(app) as test_client:
+            yield test_client
+
+
 class TestVoiceEntryRoute:
     """Test the /voice entry endpoint."""
 
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_call_start")
-    def test_voice_entry_returns_twiml(self, mock_log, mock_update, mock_get):
-        from app.main import app
-        mock_get.return_value = {"step": "greet_ask_name", "customer_phone": None, "no_input_attempts": 0}
+    def test_voice_entry_returns_twiml_and_sets_step(self, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory()
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice",
-            data={"CallSid": "CA123", "From": "+15551234567", "To": "+15559876543"},
+            content=encode_form({"CallSid": "CA123", "From": "+15551234567", "To": "+15559876543"}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
         assert "application/xml" in resp.headers["content-type"]
@@ -174,49 +297,45 @@ class TestVoiceEntryRoute:
         assert "Sears Home Services" in body
         assert "Gather" in body
 
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_call_start")
-    def test_voice_entry_sets_step(self, mock_log, mock_update, mock_get):
-        from app.main import app
-        mock_get.return_value = {"step": "greet_ask_name", "customer_phone": None, "no_input_attempts": 0}
-
-        client = TestClient(app)
-        client.post("/twilio/voice", data={"CallSid": "CA123", "From": "+1", "To": "+2"})
-
         # update_state should be called with step = greet_ask_name
-        call_args = mock_update.call_args
+        call_args = twilio_mocks.update_state.call_args
         assert call_args[0][1]["step"] == "greet_ask_name"
 
 
+class TestVoiceContinueUnknownStep:
+    def test_unknown_step_apologises_and_hangs_up(self, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(step="no_such_step")
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "hello"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        assert "something went wrong" in resp.text
+        assert "<Hangup" in resp.text
+
+
 class TestVoiceContinueGreetAskName:
     """Test the greet_ask_name step."""
 
     @patch("app.twilio_routes.llm_extract_name", return_value="John")
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_name_extraction_moves_to_understand_need(self, mock_log, mock_update, mock_get, mock_name):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "greet_ask_name",
-            "customer_phone": "+1",
-            "no_input_attempts": 0,
-            "customer_name": None,
-        }
+    def test_name_extraction_moves_to_understand_need(self, mock_name, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(customer_phone="+1")
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": "My name is John"},
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "My name is John"}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
         body = resp.text
         assert "John" in body
         assert "help you today" in body
 
-        # State should move to understand_need
-        call_args = mock_update.call_args
+        # State should move to understand_need, persisted once per turn
+        twilio_mocks.update_state.assert_called_once()
+        call_args = twilio_mocks.update_state.call_args
         assert call_args[0][1]["step"] == "understand_need"
         assert call_args[0][1]["customer_name"] == "John"
 
@@ -224,139 +343,78 @@ class TestVoiceContinueGreetAskName:
 class TestVoiceContinueUnderstandNeed:
     """Test the autonomous intent detection step."""
 
-    @patch("app.twilio_routes.llm_analyze_customer_intent")
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_schedule_intent_skips_to_zip(self, mock_log, mock_update, mock_get, mock_intent):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "understand_need",
-            "customer_name": "John",
-            "no_input_attempts": 0,
-        }
-        mock_intent.return_value = {
-            "intent": "schedule_technician",
-            "appliance_type": "washer",
-            "symptoms": None,
-            "wants_scheduling": True,
-            "has_full_description": False,
-        }
-
-        client = TestClient(app)
-        resp = client.post(
-            "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": "I want to schedule a technician for my washer"},
-        )
-        assert resp.status_code == 200
-        body = resp.text
-        assert "ZIP code" in body
-
-        call_args = mock_update.call_args
-        assert call_args[0][1]["step"] == "collect_zip"
-
+    # Utterances of SPECULATIVE_SYMPTOM_MIN_WORDS+ words start symptom extraction alongside intent analysis
+    @pytest.mark.parametrize("intent,body,expected_step,symptom_calls,body_needles", [
+        (
+            {"intent": "schedule_technician", "appliance_type": "washer", "symptoms": None,
+             "wants_scheduling": True, "has_full_description": False},
+            encode_form({"CallSid": "CA456", "SpeechResult": "I want to schedule a technician for my washer"}),
+            "collect_zip",
+            1,
+            ("zip code",),
+        ),
+        (
+            {"intent": "describe_problem", "appliance_type": "refrigerator",
+             "symptoms": "Fridge not cooling, ice buildup in freezer",
+             "wants_scheduling": False, "has_full_description": True},
+            encode_form({"CallSid": "CA456", "SpeechResult": "My fridge is not cooling and there's ice buildup in the freezer"}),
+            "offer_troubleshoot_or_schedule",
+            1,
+            ("troubleshooting", "schedule"),
+        ),
+        (
+            {"intent": "describe_problem", "appliance_type": "dryer", "symptoms": None,
+             "wants_scheduling": False, "has_full_description": False},
+            encode_form({"CallSid": "CA456", "SpeechResult": "My dryer"}),
+            "ask_symptoms",
+            0,
+            ("more about", "what's happening"),
+        ),
+    ], ids=["schedule-skips-to-zip", "full-description-offers-choice", "appliance-only-asks-symptoms"])
     @patch("app.twilio_routes.llm_analyze_customer_intent")
     @patch("app.twilio_routes.llm_extract_symptoms")
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_full_description_offers_troubleshoot_or_schedule(self, mock_log, mock_update, mock_get, mock_symptoms, mock_intent):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "understand_need",
-            "customer_name": "Jane",
-            "no_input_attempts": 0,
-        }
-        mock_intent.return_value = {
-            "intent": "describe_problem",
-            "appliance_type": "refrigerator",
-            "symptoms": "Fridge not cooling, ice buildup in freezer",
-            "wants_scheduling": False,
-            "has_full_description": True,
-        }
+    def test_intent_routing(self, mock_symptoms, mock_intent, intent, body, expected_step, symptom_calls,
+                            body_needles, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(step="understand_need", customer_name="Jane")
+        mock_intent.return_value = intent
         mock_symptoms.return_value = {
-            "symptom_summary": "Fridge not cooling, ice buildup in freezer",
+            "symptom_summary": intent["symptoms"],
             "error_codes": [],
             "is_urgent": False,
         }
 
-        client = TestClient(app)
-        resp = client.post(
-            "/twilio/voice/continue",
-            data={"CallSid": "CA456", "SpeechResult": "My fridge is not cooling and there's ice buildup in the freezer"},
-        )
-        assert resp.status_code == 200
-        body = resp.text
-        assert "troubleshooting" in body.lower() or "schedule" in body.lower()
-
-    @patch("app.twilio_routes.llm_analyze_customer_intent")
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_appliance_only_asks_for_symptoms(self, mock_log, mock_update, mock_get, mock_intent):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "understand_need",
-            "customer_name": "Bob",
-            "no_input_attempts": 0,
-        }
-        mock_intent.return_value = {
-            "intent": "describe_problem",
-            "appliance_type": "dryer",
-            "symptoms": None,
-            "wants_scheduling": False,
-            "has_full_description": False,
-        }
-
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA789", "SpeechResult": "My dryer"},
+            content=body,
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
-        body = resp.text
-        assert "more about" in body.lower() or "what's happening" in body.lower()
-
-        call_args = mock_update.call_args
-        assert call_args[0][1]["step"] == "ask_symptoms"
+        assert_any_in(resp.text, *body_needles)
+        assert mock_symptoms.call_count == symptom_calls
+        assert twilio_mocks.update_state.call_args[0][1]["step"] == expected_step
 
 
 class TestVoiceContinueNoInput:
     """Test no-input handling."""
 
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_no_input_prompts_retry(self, mock_log, mock_update, mock_get):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "greet_ask_name",
-            "no_input_attempts": 0,
-        }
+    def test_no_input_prompts_retry(self, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory()
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": ""},
+            content=encode_form({"CallSid": "CA123", "SpeechResult": ""}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
-        body = resp.text
-        assert "didn't hear" in body.lower()
-
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_three_no_inputs_falls_back_to_scheduling(self, mock_log, mock_update, mock_get):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "greet_ask_name",
-            "no_input_attempts": 3,
-        }
+        assert_any_in(resp.text, "didn't hear")
+
+    def test_three_no_inputs_falls_back_to_scheduling(self, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(no_input_attempts=3)
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": ""},
+            content=encode_form({"CallSid": "CA123", "SpeechResult": ""}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
         body = resp.text
@@ -366,78 +424,328 @@ class TestVoiceContinueNoInput:
 class TestVoiceContinueConfirmZip:
     """Test the new ZIP confirmation step."""
 
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_zip_captured_asks_confirmation(self, mock_log, mock_update, mock_get):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "collect_zip",
-            "no_input_attempts": 0,
-            "zip_attempts": 0,
-            "customer_name": "John",
-        }
+    def test_zip_captured_asks_confirmation(self, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(step="collect_zip", customer_name="John")
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": "60601"},
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "60601"}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
-        body = resp.text
-        assert "correct" in body.lower()
+        assert_any_in(resp.text, "correct")
 
-        call_args = mock_update.call_args
+        twilio_mocks.update_state.assert_called_once()
+        call_args = twilio_mocks.update_state.call_args
         assert call_args[0][1]["step"] == "confirm_zip"
         assert call_args[0][1]["zip_code"] == "60601"
+        assert call_args[0][1]["zip_spoken"] == "6 0 6 0 1"
+
+    @pytest.mark.parametrize("slow_speaker,timeout,speech_timeout", [
+        (False, "5", "auto"),
+        (True, "8", "4"),
+    ])
+    @patch("app.twilio_routes.llm_extract_zip_code", return_value=None)
+    def test_zip_retry_gather_timings(self, mock_zip, slow_speaker, timeout, speech_timeout,
+                                      twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(step="collect_zip", slow_speaker=slow_speaker)
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "hmm"}),
+            headers=FORM_HEADERS,
+        )
+        assert f'timeout="{timeout}"' in resp.text
+        assert f'speechTimeout="{speech_timeout}"' in resp.text
 
     @patch("app.twilio_routes.llm_classify_yes_no")
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_zip_confirmed_moves_to_time_pref(self, mock_log, mock_update, mock_get, mock_yn):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "confirm_zip",
-            "zip_code": "60601",
-            "no_input_attempts": 0,
-            "customer_name": "John",
-        }
+    def test_zip_confirmed_moves_to_time_pref(self, mock_yn, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="confirm_zip",
+            zip_code="60601",
+            customer_name="John",
+        )
         mock_yn.return_value = {"intent": "yes", "correction_value": None}
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": "yes"},
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "yes"}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
-        body = resp.text
-        assert "morning" in body.lower() or "afternoon" in body.lower()
+        assert_any_in(resp.text, "morning", "afternoon")
 
-        call_args = mock_update.call_args
+        twilio_mocks.update_state.assert_called_once()
+        call_args = twilio_mocks.update_state.call_args
         assert call_args[0][1]["step"] == "collect_time_pref"
 
     @patch("app.twilio_routes.llm_classify_yes_no")
-    @patch("app.twilio_routes.get_state")
-    @patch("app.twilio_routes.update_state")
-    @patch("app.twilio_routes.log_conversation")
-    def test_zip_rejected_asks_again(self, mock_log, mock_update, mock_get, mock_yn):
-        from app.main import app
-        mock_get.return_value = {
-            "step": "confirm_zip",
-            "zip_code": "60601",
-            "no_input_attempts": 0,
-            "customer_name": "John",
-        }
+    def test_zip_rejected_asks_again(self, mock_yn, twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="confirm_zip",
+            zip_code="60601",
+            customer_name="John",
+        )
         mock_yn.return_value = {"intent": "no", "correction_value": None}
 
-        client = TestClient(app)
         resp = client.post(
             "/twilio/voice/continue",
-            data={"CallSid": "CA123", "SpeechResult": "no that's wrong"},
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "no that's wrong"}),
+            headers=FORM_HEADERS,
         )
         assert resp.status_code == 200
 
-        call_args = mock_update.call_args
+        twilio_mocks.update_state.assert_called_once()
+        call_args = twilio_mocks.update_state.call_args
         assert call_args[0][1]["step"] == "collect_zip"
         assert call_args[0][1]["zip_code"] is None
+
+
+class TestVoiceContinueCollectTimePref:
+    @patch("app.twilio_routes.find_available_slots")
+    @patch("app.twilio_routes.llm_extract_time_preference")
+    def test_slots_offered_with_single_state_write(self, mock_pref, mock_slots, twilio_mocks, client,
+                                                   state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="collect_time_pref",
+            zip_code="60601",
+            appliance_type="washer",
+        )
+        mock_pref.return_value = "morning"
+        mock_slots.return_value = [{
+            "slot_id": 1, "technician_name": "Ann", "technician_id": 1,
+            "start_time": datetime(2030, 1, 7, 9), "end_time": datetime(2030, 1, 7, 11),
+        }]
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "morning please"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        assert "Option 1" in resp.text
+
+        twilio_mocks.update_state.assert_called_once()
+        saved = twilio_mocks.update_state.call_args[0][1]
+        assert saved["step"] == "choose_slot"
+        assert saved["time_preference"] == "morning"
+        assert saved["offered_slot_ids"] == [1]
+        assert "Option 1" in saved["offered_slots_speech"]
+        assert "offered_slots" not in saved
+
+
+class TestVoiceContinueChooseSlot:
+    @patch("app.twilio_routes.book_appointment")
+    @patch("app.twilio_routes.llm_classify_user_intent")
+    def test_booking_confirms_and_hangs_up(self, mock_intent, mock_book, twilio_mocks, client, state_factory):
+        start = datetime(2030, 1, 7, 14)
+        twilio_mocks.get_state.return_value = state_factory(
+            step="choose_slot",
+            zip_code="60601",
+            appliance_type="washer",
+            offered_slots=[{
+                "slot_id": 7, "technician_name": "Ann", "technician_id": 1,
+                "start_time": start, "end_time": datetime(2030, 1, 7, 16),
+            }],
+        )
+        mock_intent.return_value = {"choice": "select_slot", "confidence": 0.9}
+        mock_book.return_value = {"id": 42, "technician_name": "Ann", "start_time": start, "end_time": start}
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "option 1"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        assert "Monday, January 07 at 2 PM with technician Ann" in resp.text
+        assert "<Hangup" in resp.text
+        assert mock_book.call_args.kwargs["chosen_slot_id"] == 7
+
+        twilio_mocks.update_state.assert_called_once()
+        saved = twilio_mocks.update_state.call_args[0][1]
+        assert saved["appointment_booked"] is True
+        assert saved["appointment_id"] == 42
+
+    @patch("app.twilio_routes.book_appointment")
+    @patch("app.twilio_routes.get_slots_by_ids")
+    @patch("app.twilio_routes.llm_classify_user_intent")
+    def test_offered_slot_ids_are_looked_up(self, mock_intent, mock_lookup, mock_book, twilio_mocks, client,
+                                            state_factory):
+        start = datetime(2030, 1, 8, 9)
+        twilio_mocks.get_state.return_value = state_factory(
+            step="choose_slot",
+            zip_code="60601",
+            appliance_type="washer",
+            offered_slot_ids=[5, 9],
+        )
+        mock_lookup.return_value = [
+            {"slot_id": 5, "technician_name": "Ann", "technician_id": 1,
+             "start_time": start, "end_time": start},
+            {"slot_id": 9, "technician_name": "Bo", "technician_id": 2,
+             "start_time": datetime(2030, 1, 8, 13), "end_time": start},
+        ]
+        mock_intent.return_value = {"choice": "select_slot", "confidence": 0.9}
+        mock_book.return_value = {"id": 43, "technician_name": "Bo", "start_time": start, "end_time": start}
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "option 2"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        mock_lookup.assert_called_once_with([5, 9])
+        assert mock_book.call_args.kwargs["chosen_slot_id"] == 9
+
+    @patch("app.twilio_routes.find_available_slots")
+    @patch("app.twilio_routes.book_appointment")
+    @patch("app.twilio_routes.get_slots_by_ids")
+    @patch("app.twilio_routes.llm_classify_user_intent")
+    def test_taken_slot_is_not_shifted_onto_another(self, mock_intent, mock_lookup, mock_book, mock_find,
+                                                    twilio_mocks, client, state_factory):
+        start = datetime(2030, 1, 8, 13)
+        twilio_mocks.get_state.return_value = state_factory(
+            step="choose_slot",
+            zip_code="60601",
+            appliance_type="washer",
+            offered_slot_ids=[5, 9],
+        )
+        # Slot 5 was booked by another caller; slot 9 keeps its second position
+        mock_lookup.return_value = [
+            None,
+            {"slot_id": 9, "technician_name": "Bo", "technician_id": 2,
+             "start_time": start, "end_time": start},
+        ]
+        mock_intent.return_value = {"choice": "select_slot", "confidence": 0.9}
+        mock_find.return_value = [{"slot_id": 11, "technician_name": "Cy", "technician_id": 3,
+                                   "start_time": start, "end_time": start}]
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "option 1"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        mock_book.assert_not_called()
+        assert "just taken" in resp.text
+        assert twilio_mocks.update_state.call_args[0][1]["offered_slot_ids"] == [11]
+
+
+class TestVoiceContinueConfirmEmail:
+    @patch("app.twilio_routes.forget_cached_email")
+    @patch("app.twilio_routes.llm_classify_user_intent")
+    @patch("app.twilio_routes.llm_classify_yes_no")
+    def test_rejected_email_is_evicted_from_cache(self, mock_yn, mock_redirect, mock_forget,
+                                                  twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="confirm_email",
+            pending_email="kasi@gmail.com",
+            pending_email_speech="k a s i at gmail",
+        )
+        mock_yn.return_value = {"intent": "no", "correction_value": None}
+        mock_redirect.return_value = {"choice": "retry_email", "confidence": 0.9}
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "no that's wrong"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        mock_forget.assert_called_once_with("k a s i at gmail")
+        saved = twilio_mocks.update_state.call_args[0][1]
+        assert saved["step"] == "collect_email"
+        assert saved["pending_email_speech"] is None
+
+
+class TestVoiceContinueWaitingForUpload:
+    """Test the event-driven wakeup while waiting for an image upload."""
+
+    @patch("app.twilio_routes.wait_for_upload", new_callable=AsyncMock, return_value=True)
+    @patch("app.twilio_routes.get_upload_status_by_call_sid")
+    def test_upload_event_speaks_analysis_inline(self, mock_status, mock_wait, twilio_mocks, client,
+                                                 state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="waiting_for_upload",
+            waiting_for_upload=True,
+        )
+        mock_status.side_effect = [
+            {"image_uploaded": False, "analysis_ready": False},
+            {
+                "image_uploaded": True,
+                "analysis_ready": True,
+                "analysis_summary": "The door seal looks torn.",
+                "troubleshooting_tips": "",
+                "is_appliance_image": True,
+            },
+        ]
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": ""}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        assert "door seal looks torn" in resp.text
+        mock_wait.assert_awaited_once()
+        # Status read before the notification is refreshed once after it
+        assert mock_status.call_count == 2
+
+        call_args = twilio_mocks.update_state.call_args
+        assert call_args[0][1]["step"] == "after_analysis"
+
+    @patch("app.twilio_routes.wait_for_upload", new_callable=AsyncMock)
+    @patch("app.twilio_routes.get_upload_status_by_call_sid")
+    def test_ready_analysis_is_not_fetched_twice(self, mock_status, mock_wait, twilio_mocks, client,
+                                                 state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="waiting_for_upload",
+            waiting_for_upload=True,
+        )
+        mock_status.return_value = {
+            "image_uploaded": True,
+            "analysis_ready": True,
+            "analysis_summary": "The door seal looks torn.",
+            "troubleshooting_tips": "",
+            "is_appliance_image": True,
+        }
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": ""}),
+            headers=FORM_HEADERS,
+        )
+        assert "door seal looks torn" in resp.text
+        mock_status.assert_called_once_with("CA123")
+        mock_wait.assert_not_awaited()
+
+    @patch("app.twilio_routes.llm_interpret_upload_intent", return_value="done")
+    @patch("app.twilio_routes.wait_for_upload", new_callable=AsyncMock, return_value=True)
+    @patch("app.twilio_routes.get_upload_status_by_call_sid")
+    def test_done_waits_for_analysis_instead_of_redirect(self, mock_status, mock_wait, mock_intent,
+                                                         twilio_mocks, client, state_factory):
+        twilio_mocks.get_state.return_value = state_factory(
+            step="waiting_for_upload",
+            waiting_for_upload=True,
+        )
+        mock_status.side_effect = [
+            {"image_uploaded": True, "analysis_ready": False},
+            {
+                "image_uploaded": True,
+                "analysis_ready": True,
+                "analysis_summary": "The drain filter is clogged.",
+                "troubleshooting_tips": "",
+                "is_appliance_image": True,
+            },
+        ]
+
+        resp = client.post(
+            "/twilio/voice/continue",
+            content=encode_form({"CallSid": "CA123", "SpeechResult": "I uploaded it"}),
+            headers=FORM_HEADERS,
+        )
+        assert resp.status_code == 200
+        assert "drain filter is clogged" in resp.text
+        assert "<Pause" not in resp.text
+        mock_wait.assert_awaited_once()
+        # One lookup for the turn, one refresh after the upload event
+        assert mock_status.call_count == 2
+        assert twilio_mocks.update_state.call_args[0][1]["step"] == "after_analysis"
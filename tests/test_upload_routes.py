@@ -0,0 +1,238 @@
+"""Tests for app.upload_routes module — upload validation and analysis polling."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.upload_routes import _run_vision_and_store
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+class TestSniffImageType:
+    @pytest.mark.parametrize("head,expected", [
+        (b"\xff\xd8\xff\xe0" + b"\x00" * 12, "jpg"),
+        (PNG_BYTES[:16], "png"),
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "webp"),
+        (b"GIF89a" + b"\x00" * 10, None),
+        (b"", None),
+    ])
+    def test_magic_bytes(self, head, expected):
+        from app.upload_routes import sniff_image_type
+        assert sniff_image_type(head) == expected
+
+
+class TestUploadImage:
+    def _token(self):
+        return MagicMock(call_sid="CA123", appliance_type="washer", symptom_summary="leaking")
+
+    @patch("app.upload_routes._run_vision_and_store")
+    @patch("app.upload_routes.mark_token_used")
+    @patch("app.upload_routes.is_token_valid", return_value=True)
+    @patch("app.upload_routes.get_upload_token")
+    def test_valid_png_saved_and_analysis_scheduled(self, mock_get, mock_valid, mock_used,
+                                                    mock_vision, tmp_path):
+        from app.main import app
+        mock_get.return_value = self._token()
+        with patch("app.upload_routes.UPLOAD_DIR", tmp_path):
+            client = TestClient(app)
+            resp = client.post(
+                "/upload/tok123",
+                files={"image": ("photo.jpeg", PNG_BYTES, "image/jpeg")},
+            )
+        assert resp.status_code == 200
+        assert "/upload/tok123/status" in resp.text
+        # Sharded by token prefix, stored under the sniffed type, not the client-supplied name
+        saved = tmp_path / "to" / "k1" / "tok123.png"
+        assert saved.read_bytes() == PNG_BYTES
+        mock_used.assert_called_once_with("tok123", str(saved))
+        mock_vision.assert_called_once()
+
+    @patch("app.upload_routes._run_vision_and_store")
+    @patch("app.upload_routes.mark_token_used")
+    @patch("app.upload_routes.is_token_valid", return_value=True)
+    @patch("app.upload_routes.get_upload_token")
+    def test_large_upload_copied_from_disk_spool(self, mock_get, mock_valid, mock_used,
+                                                 mock_vision, tmp_path):
+        from app.main import app
+        mock_get.return_value = self._token()
+        # Past the 1 MB in-memory spool limit, so the upload is already a temp file
+        payload = PNG_BYTES + bytes(range(256)) * 8192
+        with patch("app.upload_routes.UPLOAD_DIR", tmp_path):
+            client = TestClient(app)
+            resp = client.post(
+                "/upload/tok456",
+                files={"image": ("photo.png", payload, "image/png")},
+            )
+        assert resp.status_code == 200
+        assert (tmp_path / "to" / "k4" / "tok456.png").read_bytes() == payload
+
+    @patch("app.upload_routes.mark_token_used")
+    @patch("app.upload_routes.is_token_valid", return_value=True)
+    @patch("app.upload_routes.get_upload_token")
+    def test_mislabelled_file_rejected_before_disk(self, mock_get, mock_valid, mock_used, tmp_path):
+        from app.main import app
+        mock_get.return_value = self._token()
+        with patch("app.upload_routes.UPLOAD_DIR", tmp_path):
+            client = TestClient(app)
+            resp = client.post(
+                "/upload/tok123",
+                files={"image": ("photo.png", b"not really an image", "image/png")},
+            )
+        assert resp.status_code == 400
+        assert list(tmp_path.iterdir()) == []
+        mock_used.assert_not_called()
+
+    @patch("app.upload_routes.MAX_UPLOAD_BYTES", 32)
+    @patch("app.upload_routes.mark_token_used")
+    @patch("app.upload_routes.is_token_valid", return_value=True)
+    @patch("app.upload_routes.get_upload_token")
+    def test_oversized_upload_rejected(self, mock_get, mock_valid, mock_used, tmp_path):
+        from app.main import app
+        mock_get.return_value = self._token()
+        with patch("app.upload_routes.UPLOAD_DIR", tmp_path):
+            client = TestClient(app)
+            resp = client.post(
+                "/upload/tok123",
+                files={"image": ("photo.png", PNG_BYTES, "image/png")},
+            )
+        assert resp.status_code == 413
+        mock_used.assert_not_called()
+
+
+class TestUploadStatus:
+    @patch("app.upload_routes.get_upload_token")
+    def test_processing_then_done(self, mock_get):
+        from app.main import app
+        token = MagicMock(analysis_summary=None)
+        mock_get.return_value = token
+        client = TestClient(app)
+        assert client.get("/upload/tok123/status").json() == {"status": "processing"}
+
+        token.analysis_summary = "Lint filter is clogged"
+        token.troubleshooting_tips = "Step 1: Clean the filter"
+        token.is_appliance_image = True
+        data = client.get("/upload/tok123/status").json()
+        assert data["status"] == "done"
+        assert data["summary"] == "Lint filter is clogged"
+        assert data["is_appliance"] is True
+
+
+class TestTroubleshootingHtml:
+    def test_steps_escaped_once_into_list(self):
+        from app.upload_routes import build_troubleshooting_html
+        html = build_troubleshooting_html("Step 1: Check <filter>\n\n Step 2: Restart ")
+        assert html == "<ul><li>Step 1: Check &lt;filter&gt;</li><li>Step 2: Restart</li></ul>"
+
+    def test_empty_steps_use_placeholder(self):
+        from app.upload_routes import _NO_TROUBLESHOOTING_HTML, build_troubleshooting_html
+        assert build_troubleshooting_html(" \n ") == _NO_TROUBLESHOOTING_HTML
+
+    @patch("app.upload_routes.notify_upload_complete")
+    @patch("app.upload_routes.update_token_analysis")
+    @patch("app.upload_routes.analyze_image_with_gemini_async", new_callable=AsyncMock)
+    def test_vision_result_stores_tips_only(self, mock_vision, mock_update, mock_notify):
+        import asyncio
+        from app.upload_routes import _run_vision_and_store
+        mock_vision.return_value = {"summary": "Clogged", "troubleshooting": "Clean filter",
+                                    "is_appliance_image": True}
+        asyncio.run(_run_vision_and_store("tok123", "/tmp/x.png", "CA123", "dryer", "no heat"))
+        kwargs = mock_update.call_args.kwargs
+        assert kwargs["troubleshooting_tips"] == "Clean filter"
+        assert "troubleshooting_html" not in kwargs
+        mock_notify.assert_called_once_with("CA123")
+
+    def test_fragment_built_once_per_tips_text(self):
+        from app.upload_routes import build_troubleshooting_html
+        build_troubleshooting_html.cache_clear()
+        first = build_troubleshooting_html("Clean filter\nRestart")
+        assert build_troubleshooting_html("Clean filter\nRestart") is first
+        assert build_troubleshooting_html.cache_info().hits == 1
+
+    @patch("app.upload_routes.get_upload_token")
+    def test_result_page_builds_list_from_tips(self, mock_get):
+        from app.main import app
+        mock_get.return_value = MagicMock(
+            analysis_summary="Clogged", is_appliance_image=True, appliance_type="dryer",
+            troubleshooting_tips="Clean <lint> filter",
+        )
+        resp = TestClient(app).get("/upload/tok123/result")
+        assert resp.status_code == 200
+        assert "<ul><li>Clean &lt;lint&gt; filter</li></ul>" in resp.text
+
+
+class TestRunVisionAndStore:
+    """Failures still store an analysis and wake the call."""
+
+    def run(self):
+        asyncio.run(_run_vision_and_store("tok123", "/tmp/x.png", "CA123", "dryer", "no heat"))
+
+    @patch("app.upload_routes.notify_upload_complete")
+    @patch("app.upload_routes.update_token_analysis")
+    @patch("app.upload_routes.analyze_image_with_gemini_async", new_callable=AsyncMock,
+           side_effect=RuntimeError("quota"))
+    def test_vision_error_stores_fallback(self, mock_vision, mock_update, mock_notify):
+        self.run()
+        mock_update.assert_called_once()
+        assert mock_update.call_args.kwargs["analysis_summary"].startswith("Image received for dryer")
+        mock_notify.assert_called_once_with("CA123")
+
+    @patch("app.upload_routes.notify_upload_complete")
+    @patch("app.upload_routes.update_token_analysis")
+    @patch("app.upload_routes.analyze_image_with_gemini_async", new_callable=AsyncMock)
+    def test_store_error_retries_with_fallback(self, mock_vision, mock_update, mock_notify):
+        mock_vision.return_value = {"summary": "Clogged", "troubleshooting": "Clean filter",
+                                    "is_appliance_image": True}
+        mock_update.side_effect = [RuntimeError("deadlock"), None]
+        self.run()
+        assert mock_update.call_count == 2
+        assert mock_update.call_args.kwargs["analysis_summary"].startswith("Image received for dryer")
+        mock_notify.assert_called_once_with("CA123")
+
+    @patch("app.upload_routes.notify_upload_complete")
+    @patch("app.upload_routes.update_token_analysis", side_effect=RuntimeError("db down"))
+    @patch("app.upload_routes.analyze_image_with_gemini_async", new_callable=AsyncMock,
+           side_effect=RuntimeError("quota"))
+    def test_db_down_still_notifies(self, mock_vision, mock_update, mock_notify):
+        self.run()
+        mock_notify.assert_called_once_with("CA123")
+
+
+class TestStaticStylesheets:
+    def test_pages_link_cacheable_stylesheet(self):
+        from app.main import app
+        from app.upload_routes import error_page
+        page = error_page("Invalid Link", "This upload link is invalid.")
+        assert "<style>" not in page
+        href = page.split('<link rel="stylesheet" href="', 1)[1].split('"', 1)[0]
+        assert href.startswith("/static/error.css?v=")
+
+        resp = TestClient(app).get(href)
+        assert resp.status_code == 200
+        assert "text/css" in resp.headers["content-type"]
+        assert resp.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+
+class TestErrorPages:
+    @patch("app.upload_routes.get_upload_token", return_value=None)
+    def test_invalid_link_served_from_cached_bytes(self, mock_get):
+        from app.main import app
+        from app.upload_routes import _static_error_page
+        resp = TestClient(app).get("/upload/missing")
+        assert resp.status_code == 404
+        assert resp.headers["content-type"] == "text/html; charset=utf-8"
+        assert resp.content == _static_error_page(
+            "Invalid Link", "This upload link is invalid or does not exist.")
+
+    @patch("app.upload_routes.is_token_valid", return_value=True)
+    @patch("app.upload_routes.get_upload_token")
+    def test_unsupported_mime_type_is_escaped(self, mock_get, mock_valid):
+        from app.main import app
+        mock_get.return_value = MagicMock()
+        resp = TestClient(app).post(
+            "/upload/tok123",
+            files={"image": ("x.gif", b"GIF89a", "image/<b>gif</b>")},
+        )
+        assert resp.status_code == 400
+        assert "&lt;b&gt;" in resp.text and "<b>gif" not in resp.text
@@ -0,0 +1,255 @@
+"""Tests for app.vision module — Gemini vision analysis."""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+class TestAnalyzeImageWithGemini:
+    def setup_method(self):
+        import app.vision
+        app.vision._model = None
+        app.vision.clear_vision_cache()
+
+    def teardown_method(self):
+        import app.vision
+        app.vision._model = None
+
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision.genai")
+    def test_model_configured_once_across_calls(self, mock_genai, tmp_path):
+        from app.vision import analyze_image_with_gemini
+        image = tmp_path / "photo.png"
+        image.write_bytes(PNG_BYTES)
+        mock_genai.GenerativeModel.return_value.generate_content.return_value = MagicMock(
+            text='{"is_appliance_image": true, "summary": "Clogged filter", "troubleshooting": "Clean it"}'
+        )
+
+        first = analyze_image_with_gemini(str(image), "dryer")
+        second = analyze_image_with_gemini(str(image), "washer")
+
+        assert first == second
+        assert first["summary"] == "Clogged filter"
+        mock_genai.configure.assert_called_once_with(api_key="test-key")
+        mock_genai.GenerativeModel.assert_called_once()
+        assert mock_genai.GenerativeModel.return_value.generate_content.call_count == 2
+        call = mock_genai.GenerativeModel.return_value.generate_content.call_args
+        assert call.args[0][1] == {"mime_type": "image/png", "data": PNG_BYTES}
+        assert call.kwargs["generation_config"]["response_mime_type"] == "application/json"
+
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision.genai")
+    def test_same_image_served_from_cache(self, mock_genai, tmp_path):
+        from app.vision import analyze_image_with_gemini
+        generate = mock_genai.GenerativeModel.return_value.generate_content
+        generate.return_value = MagicMock(
+            text='{"is_appliance_image": true, "summary": "Clogged filter", "troubleshooting": "Clean it"}'
+        )
+        (tmp_path / "a.png").write_bytes(PNG_BYTES)
+        (tmp_path / "b.png").write_bytes(PNG_BYTES)
+
+        first = analyze_image_with_gemini(str(tmp_path / "a.png"), "dryer", "no heat")
+        first["summary"] = "mutated"
+        second = analyze_image_with_gemini(str(tmp_path / "b.png"), "dryer", "no heat")
+
+        assert second["summary"] == "Clogged filter"
+        generate.assert_called_once()
+
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision._HAS_GENAI", False)
+    def test_missing_sdk_uses_fallback(self, tmp_path):
+        from app.vision import analyze_image_with_gemini
+        image = tmp_path / "w.png"
+        image.write_bytes(b"png")
+        with patch("app.vision._get_model") as get_model:
+            result = analyze_image_with_gemini(str(image), "washer")
+        get_model.assert_not_called()
+        assert result["is_appliance_image"] is True
+
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision.genai")
+    def test_empty_or_missing_file_skips_sdk(self, mock_genai, tmp_path):
+        from app.vision import analyze_image_with_gemini
+        empty = tmp_path / "empty.png"
+        empty.write_bytes(b"")
+        for path in (str(empty), str(tmp_path / "missing.png"), ""):
+            assert analyze_image_with_gemini(path, "washer")["is_appliance_image"] is True
+        mock_genai.configure.assert_not_called()
+        mock_genai.GenerativeModel.assert_not_called()
+
+    @patch("app.vision.GEMINI_API_KEY", None)
+    def test_missing_key_uses_fallback(self, tmp_path):
+        from app.vision import analyze_image_with_gemini
+        result = analyze_image_with_gemini(str(tmp_path / "missing.png"), "washer")
+        assert result["is_appliance_image"] is True
+        assert "washer" in result["summary"]
+
+
+class TestAnalyzeImageAsync:
+    def setup_method(self):
+        import app.vision
+        app.vision._model = None
+        app.vision.clear_vision_cache()
+
+    def teardown_method(self):
+        import app.vision
+        app.vision._model = None
+
+    @patch("app.vision.VISION_RETRY_BASE_DELAY", 0)
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision.genai")
+    def test_rate_limit_is_retried(self, mock_genai, tmp_path):
+        import asyncio
+        from google.api_core.exceptions import ResourceExhausted
+        from app.vision import analyze_image_with_gemini_async
+        image = tmp_path / "photo.png"
+        image.write_bytes(PNG_BYTES)
+        mock_genai.GenerativeModel.return_value.generate_content_async = AsyncMock(side_effect=[
+            ResourceExhausted("quota"),
+            MagicMock(text='{"is_appliance_image": false, "summary": "A cat", "troubleshooting": ""}'),
+        ])
+
+        result = asyncio.run(analyze_image_with_gemini_async(str(image), "oven"))
+
+        assert result == {"summary": "A cat", "troubleshooting": "", "is_appliance_image": False}
+        assert mock_genai.GenerativeModel.return_value.generate_content_async.await_count == 2
+
+
+class TestGetMimeType:
+    @pytest.mark.parametrize("path,expected", [
+        ("uploads/ab/cd/tok.PNG", "image/png"),
+        ("photo.jpeg", "image/jpeg"),
+        ("a.b/photo.webp", "image/webp"),
+        ("noext", "image/jpeg"),
+    ])
+    def test_extension_lookup(self, path, expected):
+        from app.vision import get_mime_type
+        assert get_mime_type(path) == expected
+
+
+class TestParseVisionResponse:
+    @pytest.mark.parametrize("text", [
+        '{"is_appliance_image": "false", "summary": "A dog", "troubleshooting": ""}',
+        '```json\n{"is_appliance_image": "false", "summary": "A dog", "troubleshooting": ""}\n```',
+        '  ```\n{"is_appliance_image": "false", "summary": "A dog", "troubleshooting": ""}```  ',
+    ])
+    def test_fenced_and_bare_json(self, text):
+        from app.vision import parse_vision_response
+        assert parse_vision_response(text, None, None) == {
+            "summary": "A dog", "troubleshooting": "", "is_appliance_image": False,
+        }
+
+    def test_plain_text_falls_back_to_sections(self):
+        from app.vision import parse_vision_response
+        result = parse_vision_response("Lint buildup visible\nTroubleshooting:\nClean the trap", None, None)
+        assert result["summary"] == "Lint buildup visible"
+        assert result["troubleshooting"] == "Clean the trap"
+        assert result["is_appliance_image"] is True
+
+
+class TestDownscaleImage:
+    def _png(self, width, height):
+        import io
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new("RGB", (width, height), (200, 30, 30)).save(buf, format="PNG")
+        return buf.getvalue()
+
+    @patch("app.vision.VISION_MAX_EDGE", 64)
+    def test_large_image_becomes_bounded_jpeg(self):
+        import io
+        from PIL import Image
+        from app.vision import _downscale_image
+        out = _downscale_image(self._png(256, 128))
+        with Image.open(io.BytesIO(out)) as im:
+            assert im.format == "JPEG"
+            assert im.size == (64, 32)
+
+    @patch("app.vision.VISION_MAX_EDGE", 64)
+    def test_small_image_left_alone(self):
+        from app.vision import _downscale_image
+        assert _downscale_image(self._png(32, 32)) is None
+
+    @patch("app.vision.VISION_MAX_EDGE", 64)
+    @patch("app.vision.GEMINI_DOWNSCALE", True)
+    def test_request_sends_downscaled_jpeg(self, tmp_path):
+        from app.vision import _build_vision_request
+        image = tmp_path / "photo.png"
+        image.write_bytes(self._png(256, 256))
+        parts = _build_vision_request(str(image), image.read_bytes(), "washer", None)
+        assert parts[1]["mime_type"] == "image/jpeg"
+        assert parts[1]["data"][:2] == b"\xff\xd8"
+
+
+class TestLoadImageBytes:
+    def test_returns_file_bytes_unencoded(self, tmp_path):
+        from app.vision import load_image_bytes
+        image = tmp_path / "photo.png"
+        image.write_bytes(PNG_BYTES)
+        assert load_image_bytes(str(image)) == PNG_BYTES
+
+    def test_missing_file(self, tmp_path):
+        from app.vision import load_image_bytes
+        assert load_image_bytes(str(tmp_path / "gone.png")) is None
+
+
+class TestSingleDefinition:
+    def test_vision_functions_defined_once(self):
+        import inspect
+        import re
+        import app.vision
+        source = inspect.getsource(app.vision)
+        for name in ("analyze_image_with_gemini", "parse_vision_response", "fallback_analysis"):
+            assert len(re.findall(rf"^def {name}\(", source, re.MULTILINE)) == 1, name
+
+    def test_fallback_reports_appliance_flag(self):
+        from app.vision import fallback_analysis
+        assert fallback_analysis(None, None)["is_appliance_image"] is True
+
+
+class TestWarmupVision:
+    def setup_method(self):
+        import app.vision
+        app.vision._model = None
+
+    def teardown_method(self):
+        import app.vision
+        app.vision._model = None
+
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision.genai")
+    def test_warms_async_channel(self, mock_genai):
+        import asyncio
+        from app.vision import warmup_vision
+        count = mock_genai.GenerativeModel.return_value.count_tokens_async = AsyncMock()
+        asyncio.run(warmup_vision())
+        count.assert_awaited_once()
+
+    @patch("app.vision.GEMINI_API_KEY", "test-key")
+    @patch("app.vision.genai")
+    def test_failure_is_swallowed(self, mock_genai):
+        import asyncio
+        from app.vision import warmup_vision
+        mock_genai.GenerativeModel.return_value.count_tokens_async = AsyncMock(side_effect=OSError("offline"))
+        asyncio.run(warmup_vision())
+
+    @patch("app.vision.GEMINI_API_KEY", None)
+    @patch("app.vision.genai")
+    def test_skipped_without_key(self, mock_genai):
+        import asyncio
+        from app.vision import warmup_vision
+        asyncio.run(warmup_vision())
+        mock_genai.GenerativeModel.assert_not_called()
+
+
+class TestLazySdkImport:
+    def test_app_import_without_key_does_not_load_sdk(self):
+        # Fresh interpreter: this session may already have imported the SDK
+        import os
+        import subprocess
+        import sys
+        code = "import sys, app.main; sys.exit('google.generativeai' in sys.modules)"
+        env = {**os.environ, "DATABASE_URL": "sqlite://", "GOOGLE_API_KEY": ""}
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True)
+        assert result.returncode == 0, result.stderr.decode()